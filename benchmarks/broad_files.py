@@ -0,0 +1,102 @@
+"""Broad-mode retrieval: chunk-level top-k vs per-note summary vectors.
+
+Builds a throwaway store with synthetic vectors (no model needed): most
+notes are short, and a few long notes have dozens of chunks on one topic,
+which is what crowds chunk-level results on real vaults. For
+random topic queries it reports the number of distinct notes returned (and
+how many of them are on the query's topic) and the latency of:
+
+  chunks     one 30-chunk HNSW query collapsed into files (previous behaviour)
+  summaries  VectorStore.search_broad (note summaries first, chunks only
+             for notes with long heading lists)
+
+    python benchmarks/broad_files.py [--notes 2000] [--long-notes 50] [--long-chunks 60]
+                                     [--topics 50] [--dim 384]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from notesieves.chunker import Chunk
+from notesieves.vectorstore import VectorStore
+
+
+def unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def build(store: VectorStore, args, topics: np.ndarray, rng: np.random.Generator):
+    chunks, vectors = [], []
+    for n in range(args.notes):
+        long_note = n < args.long_notes
+        count = args.long_chunks if long_note else 3
+        topic = n % args.topics
+        for i in range(count):
+            fp = f"/notes/{n:05d}.md"
+            chunks.append(Chunk(
+                text=f"note {n} chunk {i}",
+                metadata={
+                    "file_path": fp,
+                    "file_name": Path(fp).stem,
+                    "file_hash": "h",
+                    "chunk_index": i,
+                    "total_chunks_in_file": count,
+                    "heading_hierarchy": f"Topic {topic} > Part {i}",
+                },
+                id=f"{n}:{i}",
+            ))
+            vectors.append(unit(topics[topic] + rng.normal(scale=0.6 / args.dim ** 0.5, size=args.dim)))
+
+    limit = store.client.get_max_batch_size()
+    for start in range(0, len(chunks), limit):
+        store.add_chunks(chunks[start:start + limit], [v.tolist() for v in vectors[start:start + limit]])
+
+
+def chunk_level(store: VectorStore, query: list[float], top_k: int = 30) -> set[str]:
+    results = store.collection.query(query_embeddings=[query], n_results=top_k, include=["metadatas"])
+    return {meta["file_name"] for meta in results["metadatas"][0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--long-notes", type=int, default=50)
+    parser.add_argument("--long-chunks", type=int, default=60)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    topics = unit(rng.normal(size=(args.topics, args.dim)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(Path(tmp))
+        start = time.perf_counter()
+        build(store, args, topics, rng)
+        print(f"{store.count()} chunks in {args.notes} notes, built in {time.perf_counter() - start:.1f} s")
+
+        query_topics = rng.integers(args.topics, size=args.queries)
+        queries = [unit(topics[t] + rng.normal(scale=0.6 / args.dim ** 0.5, size=args.dim)).tolist() for t in query_topics]
+        for label, fn in (
+            ("chunks", lambda q: chunk_level(store, q)),
+            ("summaries", lambda q: set(store.search_broad(q, top_k=30, files=15))),
+        ):
+            distinct, on_topic, latency = [], [], []
+            for topic, q in zip(query_topics, queries):
+                t = time.perf_counter()
+                names = fn(q)
+                latency.append((time.perf_counter() - t) * 1000)
+                distinct.append(len(names))
+                on_topic.append(sum(int(name) % args.topics == topic for name in names))
+            print(
+                f"  {label:<10} {statistics.mean(distinct):6.1f} distinct notes/query "
+                f"({statistics.mean(on_topic):5.1f} on topic)   p50 {statistics.median(latency):7.2f} ms"
+            )
+
+if __name__ == "__main__":
+    main()
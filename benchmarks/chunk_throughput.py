@@ -0,0 +1,100 @@
+"""MarkdownChunker throughput (MB/s) and peak memory on large synthetic files.
+
+Writes markdown files of the requested sizes (headings, prose paragraphs,
+fenced code blocks containing `#` lines, a few very long sections), then
+chunks each one in a fresh subprocess so peak RSS is per run:
+
+  read       read_text() only: the cost of holding the whole file
+  stream     iterate MarkdownChunker.iter_chunks, discarding chunks
+  list       MarkdownChunker.chunk_file (all chunks kept, as ingest does)
+
+    python benchmarks/chunk_throughput.py [--sizes 10 100 300] [--max-tokens 500]
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from notesieves.chunker import MarkdownChunker
+
+WORDS = [
+    "".join(random.Random(i).choices("abcdefghijklmnopqrstuvwxyz", k=random.Random(-i).randint(2, 10)))
+    for i in range(5000)
+]
+
+
+def write_vault_file(path: Path, size_mb: int, seed: int = 0):
+    """Write about `size_mb` MB of markdown with a realistic mix of blocks."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    section = 0
+    with path.open("w", encoding="utf-8") as f:
+        while written < target:
+            level = rng.choice((1, 2, 2, 3, 3, 3))
+            block = [f"{'#' * level} Section {section}\n\n"]
+            section += 1
+            # Mostly short sections, sometimes one far above max_tokens.
+            paragraphs = rng.randint(1, 6) if rng.random() < 0.95 else rng.randint(50, 200)
+            for _ in range(paragraphs):
+                if rng.random() < 0.15:
+                    block.append("```python\n# a comment, not a heading\nvalue = compute()\n\n## neither is this\n```\n\n")
+                else:
+                    block.append(" ".join(rng.choices(WORDS, k=rng.randint(20, 150))) + "\n\n")
+            text = "".join(block)
+            f.write(text)
+            written += len(text)
+
+
+def measure(mode: str, path: Path, max_tokens: int) -> dict:
+    """Run one mode in this process; returns elapsed seconds, chunks and peak RSS."""
+    chunker = MarkdownChunker(max_tokens=max_tokens)
+    start = time.perf_counter()
+    if mode == "read":
+        path.read_text(encoding="utf-8")
+        chunks = 0
+    elif mode == "stream":
+        chunks = sum(1 for _ in chunker.iter_chunks(path))
+    else:
+        chunks = len(chunker.chunk_file(path))
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "chunks": chunks, "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300], help="File sizes in MB")
+    parser.add_argument("--max-tokens", type=int, default=500)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(measure(args.run[0], Path(args.run[1]), args.max_tokens)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = Path(tmp) / f"{size}mb.md"
+            write_vault_file(path, size)
+            mb = path.stat().st_size / 1024 / 1024
+            print(f"{mb:.0f} MB file")
+            for mode in ("read", "stream", "list"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--max-tokens", str(args.max_tokens), "--run", mode, str(path)],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(out.stdout)
+                print(
+                    f"  {mode:<7} {mb / result['seconds']:7.1f} MB/s   peak RSS {result['peak_rss_kb'] / 1024:7.0f} MB"
+                    + (f"   {result['chunks']} chunks" if mode != "read" else "")
+                )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
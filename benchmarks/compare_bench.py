@@ -0,0 +1,64 @@
+"""Compare two `nsie bench --output` result files, stage by stage.
+
+For each stage present in both files, prints the headline metric (p50 for
+latency stages, seconds otherwise) of each run and the change, and exits
+non-zero when any stage is slower than `--threshold` percent. Vault and
+config differences between the runs are printed first, since they make
+the numbers incomparable.
+
+    nsie bench -o before.json   # on the base commit
+    nsie bench -o after.json    # on the change
+    python benchmarks/compare_bench.py before.json after.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def headline(stage: dict) -> tuple[str, float]:
+    if "p50_ms" in stage:
+        return "p50 ms", stage["p50_ms"]
+    return "ms", stage["seconds"] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Slowdown in percent that counts as a regression")
+    parser.add_argument("--skip", nargs="*", default=["load_model"], help="Stages to leave out of the regression check")
+    args = parser.parse_args()
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    if before["version"] != after["version"]:
+        sys.exit(f"Result format differs ({before['version']} vs {after['version']}); rerun both.")
+
+    print(f"{before['commit']} → {after['commit']}")
+    for section in ("vault", "config", "host"):
+        for key in sorted(before[section].keys() | after[section].keys()):
+            if before[section].get(key) != after[section].get(key):
+                print(f"  [differs] {section}.{key}: {before[section].get(key)} → {after[section].get(key)}")
+
+    regressions = []
+    print(f"\n  {'stage':<20} {'metric':<7} {'before':>10} {'after':>10} {'change':>8}")
+    for name, stage in after["stages"].items():
+        if name not in before["stages"]:
+            continue
+        unit, new = headline(stage)
+        _, old = headline(before["stages"][name])
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > args.threshold and name not in args.skip:
+            regressions.append(name)
+            flag = "  slower"
+        print(f"  {name:<20} {unit:<7} {old:10.2f} {new:10.2f} {change:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} stages slower than {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Embedding throughput: plain `model.encode` vs `EmbeddingService.embed_batch`.
+
+Chunks a markdown corpus (the bundled sample notes by default), repeats it
+to get a measurable workload, and reports chunks/sec for:
+
+  before   model.encode(texts) in file order, default settings
+  after    EmbeddingService.embed_batch (length-sorted batches)
+  after/N  the same with an N-process CPU encode pool (--processes N)
+
+    python benchmarks/embed_throughput.py [NOTES_DIR] [--model NAME] [--repeat 50]
+                                          [--batch-size 32] [--processes 4]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from notesieves.chunker import MarkdownChunker
+from notesieves.embeddings import EmbeddingService
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "data" / "test_notes"
+
+
+def load_texts(notes_dir: Path, repeat: int) -> list[str]:
+    chunker = MarkdownChunker()
+    texts = []
+    for file_path in sorted(notes_dir.rglob("*.md")):
+        texts.extend(chunk.text for chunk in chunker.chunk_file(file_path))
+    # Vary each copy slightly so nothing downstream can dedupe the work.
+    return [f"{text} ({i})" for i in range(repeat) for text in texts]
+
+
+def timed(label: str, fn, texts: list[str]) -> float:
+    start = time.perf_counter()
+    fn(texts)
+    elapsed = time.perf_counter() - start
+    rate = len(texts) / elapsed
+    print(f"  {label:<10} {elapsed:8.2f} s  {rate:10.1f} chunks/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("notes_dir", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = load_texts(args.notes_dir, args.repeat)
+    print(f"{len(texts)} chunks from {args.notes_dir}")
+
+    service = EmbeddingService(args.model, batch_size=args.batch_size)
+    service.embed_batch(texts[:8], show_progress_bar=False)  # warm up
+
+    before = timed("before", lambda t: service.backend.model.encode(t), texts)
+    after = timed("after", lambda t: service.embed_batch(t, show_progress_bar=False), texts)
+    print(f"  speedup    {after / before:8.2f}x")
+
+    if args.processes > 1:
+        pooled = EmbeddingService(args.model, batch_size=args.batch_size, processes=args.processes)
+        pooled.embed_batch(texts[: 2 * args.batch_size], show_progress_bar=False)  # start the pool
+        pooled_rate = timed(f"after/{args.processes}", lambda t: pooled.embed_batch(t, show_progress_bar=False), texts)
+        print(f"  speedup    {pooled_rate / before:8.2f}x")
+        pooled.close()
+
+
+if __name__ == "__main__":
+    main()
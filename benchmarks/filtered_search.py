@@ -0,0 +1,124 @@
+"""Filtered retrieval: metadata pushdown into Chroma vs post-filtering.
+
+Builds a throwaway store of synthetic notes (no model needed) spread over
+project folders, then answers top-k queries restricted to one project:
+
+  pushdown     VectorStore.search with a --path filter (a Chroma `where` on
+               the folder token, applied before the neighbours are picked)
+  post-N       an unfiltered query for N × top-k neighbours, then dropping
+               those outside the project (the only option without filters)
+
+For each it reports latency and recall against exact brute-force top-k
+within the project; post-filtering loses recall whenever fewer than top-k
+of the over-fetched neighbours happen to be in the project.
+
+    python benchmarks/filtered_search.py [--notes 5000] [--chunks-per-note 5] [--projects 20]
+                                         [--queries 100] [--top-k 5] [--dim 384]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from notesieves.chunker import Chunk
+from notesieves.vectorstore import VectorStore
+
+
+def unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def build(store: VectorStore, args, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """Index the synthetic notes; returns every chunk vector and its project."""
+    chunks, vectors, projects = [], [], []
+    for n in range(args.notes):
+        project = n % args.projects
+        fp = f"/notes/p{project:02d}/{n:05d}.md"
+        for i in range(args.chunks_per_note):
+            chunks.append(Chunk(
+                text=f"note {n} chunk {i}",
+                metadata={
+                    "file_path": fp,
+                    "file_name": Path(fp).stem,
+                    "file_hash": "h",
+                    "folder": str(Path(fp).parent),
+                    "mtime": 0.0,
+                    "chunk_index": i,
+                    "total_chunks_in_file": args.chunks_per_note,
+                    "heading_hierarchy": f"Part {i}",
+                },
+                id=f"{n}:{i}",
+            ))
+            vectors.append(unit(rng.normal(size=args.dim)).astype(np.float32))
+            projects.append(project)
+
+    limit = store.client.get_max_batch_size()
+    for start in range(0, len(chunks), limit):
+        store.add_chunks(chunks[start:start + limit], [v.tolist() for v in vectors[start:start + limit]])
+    return np.array(vectors), np.array(projects)
+
+
+def post_filter(store: VectorStore, query: list[float], folder: str, top_k: int, overfetch: int) -> list[str]:
+    results = store.collection.query(query_embeddings=[query], n_results=top_k * overfetch, include=["metadatas"])
+    hits = [i for i, meta in zip(results["ids"][0], results["metadatas"][0]) if meta["folder"] == folder]
+    return hits[:top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--chunks-per-note", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(Path(tmp))
+        start = time.perf_counter()
+        vectors, projects = build(store, args, rng)
+        print(
+            f"{store.count()} chunks in {args.notes} notes over {args.projects} projects, "
+            f"built in {time.perf_counter() - start:.1f} s"
+        )
+
+        ids = np.array([f"{n}:{i}" for n in range(args.notes) for i in range(args.chunks_per_note)])
+        queries = unit(rng.normal(size=(args.queries, args.dim))).astype(np.float32)
+        targets = rng.integers(args.projects, size=args.queries)
+        exact = []
+        for q, project in zip(queries, targets):
+            in_project = np.flatnonzero(projects == project)
+            best = in_project[np.argsort(-(vectors[in_project] @ q))[:args.top_k]]
+            exact.append(set(ids[best]))
+
+        methods = {
+            "pushdown": lambda q, p: [
+                c["id"] for c in store.search(q, top_k=args.top_k, filters={"path": f"/notes/p{p:02d}/*"})
+            ],
+        }
+        for overfetch in (4, 20, 100):
+            methods[f"post-{overfetch}"] = lambda q, p, n=overfetch: post_filter(
+                store, q, f"/notes/p{p:02d}", args.top_k, n
+            )
+
+        for label, fn in methods.items():
+            latency, recall = [], []
+            for q, project, truth in zip(queries, targets, exact):
+                t = time.perf_counter()
+                found = fn(q.tolist(), int(project))
+                latency.append((time.perf_counter() - t) * 1000)
+                recall.append(len(truth & set(found)) / args.top_k)
+            latency.sort()
+            print(
+                f"  {label:<9} recall@{args.top_k} {statistics.mean(recall):5.2f}   "
+                f"p50 {statistics.median(latency):7.2f} ms   p99 {latency[int(len(latency) * 0.99) - 1]:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Check the per-command import budget with `python -X importtime`.
+
+Runs each lightweight CLI command in a scratch directory (with its own
+config.yaml and an empty index) and fails if a heavy module leaks into its
+import path or if the total import time exceeds the budget documented in
+the README.
+
+    python benchmarks/import_budget.py            # leaks + time budget
+    python benchmarks/import_budget.py --no-time  # leaks only (noisy CI hosts)
+"""
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HEAVY = {"torch", "sentence_transformers", "transformers", "anthropic"}
+
+# command args → (modules that must not be imported, import budget in ms)
+BUDGETS = {
+    ("--help",): (HEAVY | {"chromadb"}, 400),
+    ("ask", "--help"): (HEAVY | {"chromadb"}, 400),
+    ("ingest", "--help"): (HEAVY | {"chromadb"}, 400),
+    ("bench", "--help"): (HEAVY | {"chromadb"}, 400),
+    ("status",): (HEAVY, 2000),
+    ("list",): (HEAVY, 2000),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(args: tuple[str, ...], cwd: Path) -> tuple[set[str], float]:
+    """Return (imported top-level packages, total import time in ms)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "notesieves.cli", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"nsie {' '.join(args)} failed:\n{proc.stdout}{proc.stderr}")
+
+    modules = set()
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(name.split(".")[0])
+        if len(indent) == 1:
+            total_us += cumulative
+    return modules, total_us / 1000
+
+
+def main() -> int:
+    check_time = "--no-time" not in sys.argv[1:]
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = Path(tmp)
+        (cwd / "config.yaml").write_text(
+            "paths:\n"
+            f"  notes_directory: {cwd}\n"
+            f"  database_directory: {cwd / 'chroma'}\n"
+            "daemon:\n"
+            f"  socket_path: {cwd / 'nsie.sock'}\n"
+        )
+
+        for args, (forbidden, budget_ms) in BUDGETS.items():
+            modules, total_ms = measure(args, cwd)
+            leaked = sorted(forbidden & modules)
+            over = check_time and total_ms > budget_ms
+
+            status = "FAIL" if leaked or over else "ok"
+            failures += status == "FAIL"
+            print(f"{status:4}  nsie {' '.join(args):<16} {total_ms:8.1f} ms  (budget {budget_ms} ms)")
+            if leaked:
+                print(f"      heavy imports: {', '.join(leaked)}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Check that an index built before the catalog and filter fields existed migrates.
+
+Writes a few notes and indexes them the way the original VectorStore did
+(a bare Chroma collection, chunk ids `<hash>_<index>`, no catalog, no
+`folder`/`mtime` metadata), then opens it with the current VectorStore and
+checks that the catalog, the lexical index and the note summaries were
+built, and that `since`/`path` filters still find every note. Exits
+non-zero on the first failed check.
+
+    python benchmarks/index_migration.py [--notes 20] [--dim 384]
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+from notesieves.vectorstore import VectorStore
+
+
+def build_baseline(db: Path, vault: Path, notes: int, dim: int, rng: np.random.Generator) -> list[float]:
+    """Index `notes` two-chunk notes with the original schema; returns one query vector."""
+    client = chromadb.PersistentClient(path=str(db))
+    collection = client.get_or_create_collection(name="notes", metadata={"hnsw:space": "cosine"})
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for n in range(notes):
+        fp = vault / f"folder{n % 2}" / f"note{n}.md"
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(f"# Note {n}\n\nfirst part\n\n## Detail\n\nsecond part\n")
+        for i, heading in enumerate([f"Note {n}", f"Note {n} > Detail"]):
+            ids.append(f"hash{n}_{i}")
+            vector = rng.normal(size=dim)
+            embeddings.append((vector / np.linalg.norm(vector)).tolist())
+            documents.append(f"note {n} part {i}")
+            metadatas.append({
+                "file_path": str(fp),
+                "file_name": fp.stem,
+                "heading_hierarchy": heading,
+                "chunk_index": i,
+                "total_chunks_in_file": 2,
+                "file_hash": f"hash{n}",
+            })
+    collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    return embeddings[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(label: str, ok: bool, detail: str = ""):
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}{f'  ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(label)
+
+    with tempfile.TemporaryDirectory(prefix="nsie-migrate-") as tmp:
+        db, vault = Path(tmp) / "chroma", Path(tmp) / "vault"
+        query = build_baseline(db, vault, args.notes, args.dim, np.random.default_rng(0))
+
+        store = VectorStore(db)
+        files = list(store.catalog.iter_files())
+        check("catalog rebuilt", len(files) == args.notes, f"{len(files)} files")
+        check("catalog mtimes", all(row["mtime"] is not None for row in files))
+        check("lexical index rebuilt", store.lexical.count() == 2 * args.notes)
+        check("summaries built", store.summaries.count() == args.notes)
+
+        top_k = 2 * args.notes
+        unfiltered = store.search(query, top_k=top_k)
+        since = store.search(query, top_k=top_k, filters={"since": 0})
+        check("search with since", len(since) == len(unfiltered) == top_k, f"{len(since)} of {len(unfiltered)}")
+        folder = store.search(query, top_k=top_k, filters={"path": f"{vault}/folder0/*"})
+        check("search with path", len(folder) == 2 * ((args.notes + 1) // 2), f"{len(folder)} chunks")
+        broad = store.search_broad(query, top_k=top_k, files=args.notes, filters={"since": 0})
+        check("search_broad with since", len(broad) == args.notes, f"{len(broad)} notes")
+
+    if failures:
+        sys.exit(f"{len(failures)} checks failed: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
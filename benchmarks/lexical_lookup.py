@@ -0,0 +1,105 @@
+"""BM25 lookup latency of the lexical index on a synthetic corpus.
+
+Builds a throwaway LexicalIndex with N chunks of Zipf-distributed words,
+sprinkled with unique identifiers (error codes, snake_case names), then
+times `LexicalIndex.search` for three query shapes:
+
+  identifier   one rare token (the case hybrid retrieval is for)
+  mixed        a natural question around a rare identifier
+  common       several frequent words only (worst case: long posting lists)
+
+At 1M chunks the automatic postings cap is its 20000 ceiling; p50 / p99:
+
+  identifier   0.03 / 0.05 ms
+  mixed        0.64 / 2.3 ms
+  common       3.5 / 4.4 ms   (16.6 / 19.8 ms with --max-postings 100000,
+                               the old uncapped 10% share)
+
+Common-word queries cost about one posting-list read per term up to the
+cap, so the cap bounds their latency; the others stay sub-millisecond.
+
+    python benchmarks/lexical_lookup.py [--chunks 1000000] [--queries 200] [--top-k 20]
+                                        [--max-postings 0]
+"""
+import argparse
+import itertools
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from notesieves.chunker import Chunk
+from notesieves.lexical import LexicalIndex
+
+VOCABULARY = [f"w{i}" for i in range(50_000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def make_chunk(i: int, rng: random.Random) -> Chunk:
+    words = rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=80)
+    words.insert(rng.randrange(len(words)), f"ERR_{i:07d}")
+    return Chunk(text=" ".join(words), metadata={"file_path": f"/notes/{i // 5}.md"}, id=f"c{i}")
+
+
+def build(index: LexicalIndex, chunks: int, seed: int = 0):
+    rng = random.Random(seed)
+    batch = []
+    for i in range(chunks):
+        batch.append(make_chunk(i, rng))
+        if len(batch) == 10_000:
+            index.add(batch)
+            batch = []
+    if batch:
+        index.add(batch)
+    index.optimize()
+
+
+def timed(index: LexicalIndex, queries: list[str], top_k: int, max_postings: int) -> list[float]:
+    index.search(queries[0], top_k, max_postings)  # warm the page cache
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, top_k, max_postings)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--max-postings", type=int, default=0, help="0 = scale with the index, as retrieval does")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    shapes = {
+        "identifier": [f"ERR_{rng.randrange(args.chunks):07d}" for _ in range(args.queries)],
+        "mixed": [
+            f"what does ERR_{rng.randrange(args.chunks):07d} mean for {rng.choice(VOCABULARY[5000:])}"
+            for _ in range(args.queries)
+        ],
+        "common": [" ".join(rng.sample(VOCABULARY[:20], 3)) for _ in range(args.queries)],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "lexical.sqlite3"
+        index = LexicalIndex(path)
+        start = time.perf_counter()
+        build(index, args.chunks)
+        print(
+            f"{args.chunks} chunks indexed in {time.perf_counter() - start:.1f} s, "
+            f"{path.stat().st_size / 1024 / 1024:.0f} MB on disk"
+        )
+
+        for shape, queries in shapes.items():
+            samples = sorted(timed(index, queries, args.top_k, args.max_postings))
+            p50 = statistics.median(samples)
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            print(f"  {shape:<11} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
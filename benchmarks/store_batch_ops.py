@@ -0,0 +1,133 @@
+"""Per-file vs batched VectorStore writes.
+
+Fills a throwaway store with synthetic chunks (random vectors, no model
+needed) and times, for the same set of files, the writes ingest used to
+make against the ones it makes now:
+
+  delete   a `where` delete per file   vs  one delete_files() call
+  replace  a `where` delete per file,  vs  one replace_files() call
+           then one add of the new chunks
+
+The per-file loop is the original code path and only touches the Chroma
+collection; the batched calls also keep the catalog, the lexical index
+and the note summaries up to date, so the speedup understates the
+difference in Chroma work alone.
+
+    python benchmarks/store_batch_ops.py [--files 2000] [--chunks 5] [--dim 384]
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from notesieves.chunker import Chunk
+from notesieves.vectorstore import VectorStore
+
+
+def make_chunks(file_path: str, count: int, tag: str) -> list[Chunk]:
+    return [
+        Chunk(
+            text=f"{tag} chunk {i} of {file_path}",
+            metadata={
+                "file_path": file_path,
+                "file_name": Path(file_path).stem,
+                "file_hash": tag,
+                "chunk_index": i,
+                "total_chunks_in_file": count,
+            },
+            id=f"{file_path}:{tag}:{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def vectors(count: int, dim: int) -> list[list[float]]:
+    return [[random.random() for _ in range(dim)] for _ in range(count)]
+
+
+def fill(store: VectorStore, paths: list[str], chunks_per_file: int, dim: int):
+    chunks = [c for fp in paths for c in make_chunks(fp, chunks_per_file, "v1")]
+    limit = store.client.get_max_batch_size()
+    for start in range(0, len(chunks), limit):
+        batch = chunks[start:start + limit]
+        store.add_chunks(batch, vectors(len(batch), dim))
+
+
+def updates_for(paths: list[str], chunks_per_file: int, dim: int) -> list[dict]:
+    """Replace every file's chunks: drop all v1 chunks, add one v2 chunk each."""
+    return [
+        {
+            "path": fp,
+            "hash": "v2",
+            "mtime": None,
+            "added": make_chunks(fp, 1, "v2"),
+            "embeddings": vectors(1, dim),
+            "kept": [],
+            "removed_ids": [f"{fp}:v1:{i}" for i in range(chunks_per_file)],
+        }
+        for fp in paths
+    ]
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed:8.2f} s")
+    return elapsed
+
+
+def compare(name: str, args, loop, batched):
+    print(f"{name}:")
+    results = []
+    for label, fn in (("per-file loop", loop), ("batched", batched)):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore(Path(tmp))
+            paths = [f"/notes/{i:05d}.md" for i in range(args.files)]
+            fill(store, paths, args.chunks, args.dim)
+            results.append(timed(label, lambda: fn(store, paths)))
+            assert store.count() == (0 if name == "delete" else len(paths)), "store left in unexpected state"
+    print(f"  {'speedup':<22} {results[0] / results[1]:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    print(f"{args.files} files x {args.chunks} chunks, dim {args.dim}")
+
+    def delete_loop(store, paths):
+        for fp in paths:
+            store.collection.delete(where={"file_path": fp})
+
+    compare("delete", args, delete_loop, lambda store, paths: store.delete_files(paths))
+
+    def replace_loop(store, paths):
+        updates = updates_for(paths, args.chunks, args.dim)
+        delete_loop(store, paths)
+        chunks = [c for u in updates for c in u["added"]]
+        embeddings = [e for u in updates for e in u["embeddings"]]
+        limit = store.client.get_max_batch_size()
+        for start in range(0, len(chunks), limit):
+            batch = chunks[start:start + limit]
+            store.collection.add(
+                ids=[c.id for c in batch],
+                embeddings=embeddings[start:start + limit],
+                documents=[c.text for c in batch],
+                metadatas=[c.metadata for c in batch],
+            )
+
+    compare(
+        "replace",
+        args,
+        replace_loop,
+        lambda store, paths: store.replace_files(updates_for(paths, args.chunks, args.dim)),
+    )
+
+
+if __name__ == "__main__":
+    main()
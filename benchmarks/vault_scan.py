@@ -0,0 +1,77 @@
+"""Vault scan time: `Path.rglob("*.md")` vs VaultScanner.
+
+Builds a synthetic vault of notes in nested folders next to the clutter
+real vaults carry (a .git object store, node_modules, an attachments folder
+ignored through .gitignore), then times, with a warm page cache:
+
+  rglob      sorted(root.rglob("*.md")) (the previous ingest scan)
+  scanner    VaultScanner with the default excludes, 1 thread
+  scanner/N  the same with N threads (--threads)
+
+    python benchmarks/vault_scan.py [--notes 20000] [--clutter 100000] [--threads 8] [--repeat 5]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from notesieves.config import IngestConfig
+from notesieves.scanner import VaultScanner
+
+
+def build(root: Path, notes: int, clutter: int):
+    for i in range(notes):
+        folder = root / f"area{i % 20}" / f"project{i % 200}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"note{i}.md").write_text("# note\n")
+    per_kind = clutter // 3
+    for i in range(per_kind):
+        obj = root / ".git" / "objects" / f"{i % 256:02x}"
+        obj.mkdir(parents=True, exist_ok=True)
+        (obj / f"{i:038x}").touch()
+        module = root / "node_modules" / f"pkg{i % 500}" / "docs"
+        module.mkdir(parents=True, exist_ok=True)
+        (module / f"README{i}.md").touch()
+        attachments = root / "attachments" / f"{i % 100}"
+        attachments.mkdir(parents=True, exist_ok=True)
+        (attachments / f"image{i}.png").touch()
+    (root / ".gitignore").write_text("attachments/\n")
+
+
+def timed(fn, repeat: int) -> tuple[float, int]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20_000)
+    parser.add_argument("--clutter", type=int, default=100_000, help="Files in .git, node_modules and attachments")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    defaults = IngestConfig()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        build(root, args.notes, args.clutter)
+        print(f"{args.notes} notes, {args.clutter} clutter files")
+
+        methods = {
+            "rglob": lambda: sorted(root.rglob("*.md")),
+            "scanner": lambda: VaultScanner(root, exclude=defaults.exclude).scan().files,
+            f"scanner/{args.threads}": lambda: VaultScanner(root, exclude=defaults.exclude, threads=args.threads).scan().files,
+        }
+        for label, fn in methods.items():
+            fn()  # warm the dentry cache
+            seconds, found = timed(fn, args.repeat)
+            print(f"  {label:<11} {seconds * 1000:8.1f} ms   {found} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import anthropic
+from rich.console import Console
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
+
+from .cache import AnswerCache, answer_key
+from .config import Config
+from .context import pack_context
+from .daemon import connect
+from .prompts import (
+    BROAD_SYSTEM_PROMPT,
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    build_broad_user_prompt,
+    build_user_prompt,
+)
+from .trace import span
+
+console = Console()
+
+
+class BatchFileError(ValueError):
+    """A line of the question file that is not valid JSON or has no question."""
+
+
+def _read_questions(input_path: Path) -> list[dict]:
+    """Read a JSONL question file.
+
+    Each line is either a JSON string or an object with a "question" and an
+    optional "id"; questions without an id are numbered by line. Raises
+    BatchFileError naming the file and line of the first bad entry.
+    """
+    questions = []
+    with input_path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BatchFileError(
+                    f"{input_path}, line {line_number}: not valid JSON ({e.msg} at column {e.colno})"
+                ) from None
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict) or not isinstance(record.get("question"), str):
+                raise BatchFileError(
+                    f'{input_path}, line {line_number}: expected a string or an object with a "question"'
+                )
+            questions.append({"id": str(record.get("id", line_number)), "question": record["question"]})
+    return questions
+
+
+def _answered_ids(output_path: Path) -> set[str]:
+    """IDs that already have an answer in the output file (for resuming)."""
+    done = set()
+    if not output_path.exists():
+        return done
+    with output_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial last line from an interrupted run
+            if "answer" in record:
+                done.add(record["id"])
+    return done
+
+
+def _prepare(
+    questions: list[dict],
+    embedder,
+    store,
+    config: Config,
+    broad: bool,
+    filters: dict | None = None,
+) -> list[dict]:
+    """Embed all questions in one batch, retrieve context and build prompts."""
+    embeddings = embedder.embed_queries([q["question"] for q in questions])
+
+    if broad:
+        results = [
+            store.search_broad(e, top_k=30, files=config.retrieval.broad_files, filters=filters) for e in embeddings
+        ]
+    else:
+        results = store.search_many(
+            embeddings,
+            top_k=config.retrieval.top_k,
+            query_texts=[q["question"] for q in questions] if config.retrieval.hybrid else None,
+            candidates=config.retrieval.candidates,
+            filters=filters,
+            max_postings=config.retrieval.lexical_max_postings,
+        )
+
+    jobs = []
+    for q, result in zip(questions, results):
+        if broad:
+            system_prompt, user_prompt = BROAD_SYSTEM_PROMPT, build_broad_user_prompt(q["question"], result)
+            sources, files = result, sorted(result)
+            context = None
+        else:
+            passages, context = pack_context(result, embedder.count_tokens, config.retrieval.context_token_budget)
+            system_prompt, user_prompt = SYSTEM_PROMPT, build_user_prompt(q["question"], passages)
+            sources = [[c["id"], c["metadata"].get("file_hash", "")] for c in result]
+            files = sorted({c["metadata"].get("file_name", "Unknown") for c in passages})
+        jobs.append({
+            **q,
+            "empty": not result,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": user_prompt}],
+            "key": answer_key(
+                q["question"],
+                "broad" if broad else "detailed",
+                config.llm.model,
+                PROMPT_VERSION,
+                sources,
+                config.retrieval.context_token_budget,
+            ),
+            "sources": files,
+            "context": context,
+        })
+    return jobs
+
+
+async def _answer(job: dict, llm, cache: AnswerCache, use_cache: bool, limit: asyncio.Semaphore) -> dict:
+    record = {"id": job["id"], "question": job["question"], "sources": job["sources"]}
+    if job["context"]:
+        record["context"] = job["context"]
+    if job["empty"]:
+        return {**record, "answer": "", "note": "no relevant content found"}
+
+    cached = cache.get(job["key"]) if use_cache else None
+    if cached is not None:
+        return {**record, "answer": cached, "cached": True}
+
+    async with limit:
+        started_at = time.perf_counter()
+        try:
+            answer, usage = await llm.agenerate_multiturn(job["system"], job["messages"], usage=True)
+        except anthropic.AuthenticationError:
+            raise
+        except Exception as e:
+            return {**record, "error": f"{type(e).__name__}: {e}"}
+    cache.put(job["key"], answer)
+    return {
+        **record,
+        "answer": answer,
+        "cached": False,
+        "usage": usage,
+        "elapsed_ms": round((time.perf_counter() - started_at) * 1000),
+    }
+
+
+async def _run_jobs(jobs: list[dict], llm, cache: AnswerCache, use_cache: bool, concurrency: int, out, progress, task):
+    limit = asyncio.Semaphore(concurrency)
+    counts = {"answered": 0, "cached": 0, "failed": 0}
+    pending = [asyncio.ensure_future(_answer(job, llm, cache, use_cache, limit)) for job in jobs]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            record = await next_done
+            # Written in completion order and flushed per line, so an
+            # interrupted run loses nothing that already finished.
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in record:
+                counts["failed"] += 1
+            elif record.get("cached"):
+                counts["cached"] += 1
+            else:
+                counts["answered"] += 1
+            progress.advance(task)
+    finally:
+        for future in pending:
+            future.cancel()
+    return counts
+
+
+def run_batch(
+    config: Config,
+    input_path: Path,
+    output_path: Path,
+    broad: bool = False,
+    concurrency: int | None = None,
+    use_cache: bool = True,
+    filters: dict | None = None,
+):
+    """Answer every question in a JSONL file, appending results to `output_path`.
+
+    Questions already answered in `output_path` are skipped, so rerunning
+    the same command resumes an interrupted run (failed ones are retried).
+    """
+    questions = _read_questions(input_path)
+    done = _answered_ids(output_path)
+    todo = [q for q in questions if q["id"] not in done]
+    console.print(f"Found {len(questions)} questions ({len(questions) - len(todo)} already answered)")
+    if not todo:
+        console.print("[green]Everything answered.[/green]")
+        return
+
+    client = connect(config)
+    if client is not None:
+        embedder, store = client.embedder, client.store
+    else:
+        with console.status("Loading embedding model..."), span("load.embedding_model"):
+            from .embeddings import EmbeddingService
+            embedder = EmbeddingService.from_config(config)
+
+        with span("load.store"):
+            from .vectorstore import VectorStore
+            store = VectorStore(config.paths.database_directory)
+
+    if store.count() == 0:
+        console.print("[red]No notes indexed yet. Run 'nsie ingest' first.[/red]")
+        return
+
+    with console.status(f"Retrieving context for {len(todo)} questions..."), span("retrieve", questions=len(todo)):
+        jobs = _prepare(todo, embedder, store, config, broad, filters)
+
+    # The async client cannot go through the daemon, so LLM calls are made here.
+    from .llm import LLMService
+
+    llm = LLMService.from_config(config)
+    cache = AnswerCache.from_config(config)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("a", encoding="utf-8") as out, Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Answering...", total=len(jobs))
+        with span("llm", questions=len(jobs)):
+            counts = asyncio.run(_run_jobs(
+                jobs, llm, cache, use_cache, concurrency or config.llm.batch_concurrency, out, progress, task,
+            ))
+    cache.evict()
+    cache.close()
+
+    console.print(
+        f"[green]Done.[/green] {counts['answered']} answered, {counts['cached']} from cache, "
+        f"{counts['failed']} failed → {output_path}"
+    )
+    if counts["failed"]:
+        console.print("  [yellow]Rerun the same command to retry the failed questions.[/yellow]")
@@ -0,0 +1,351 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from .chunker import MarkdownChunker
+from .config import Config, PathsConfig
+from .context import pack_context
+from .ingest import _hash_file, _iter_file_batches, run_ingest
+from .prompts import SYSTEM_PROMPT, build_user_prompt
+from .scanner import VaultScanner
+
+console = Console()
+
+# Bump when stages or fields change meaning, so old result files aren't compared blindly.
+RESULTS_VERSION = 1
+
+_RATE_UNITS = {"files_per_s": "files/s", "mb_per_s": "MB/s", "chunks_per_s": "chunks/s"}
+
+
+def _words(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 10))) for _ in range(count)]
+
+
+def generate_vault(
+    root: Path,
+    files: int = 200,
+    headings: int = 4,
+    paragraphs: int = 3,
+    words: int = 60,
+    seed: int = 0,
+) -> dict:
+    """Write a synthetic vault of `files` notes under `root`.
+
+    Each note has `headings` sections (nested up to three levels) of
+    `paragraphs` paragraphs of about `words` words, drawn from a skewed
+    vocabulary with a topic word per note so queries have something to
+    find. Some sections hold a fenced code block. Notes are spread over
+    nested folders. Returns the file count, total bytes and topic words.
+    """
+    rng = random.Random(seed)
+    vocabulary = _words(5000, seed)
+    topics = _words(max(files // 10, 1), seed + 1)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]  # Zipf-like
+    total = 0
+    for i in range(files):
+        topic = topics[i % len(topics)]
+        folder = root / f"area{i % 10}" / f"project{i % 40}"
+        folder.mkdir(parents=True, exist_ok=True)
+        lines = [f"# {topic} note {i}\n"]
+        for h in range(headings):
+            level = 2 + (h % 2) if h else 2
+            lines.append(f"\n{'#' * level} {topic} {' '.join(rng.choices(vocabulary[:500], k=2))}\n")
+            for _ in range(paragraphs):
+                n = max(1, int(rng.gauss(words, words / 4)))
+                body = rng.choices(vocabulary, weights=weights, k=n)
+                body.insert(rng.randrange(n), topic)
+                lines.append("\n" + " ".join(body) + "\n")
+            if rng.random() < 0.1:
+                lines.append("\n```python\n# not a heading\nvalue = compute()\n```\n")
+        text = "".join(lines)
+        (folder / f"note{i}.md").write_text(text, encoding="utf-8")
+        total += len(text.encode("utf-8"))
+    return {"files": files, "bytes": total, "topics": topics}
+
+
+class StubLLM:
+    """Stands in for LLMService so the ask path can be timed offline.
+
+    Replies with a fixed answer after `latency` seconds, and keeps the size
+    of the last prompt it was sent.
+    """
+
+    def __init__(self, latency: float = 0.0, reply: str = "Stub answer citing Context 1."):
+        self.latency = latency
+        self.reply = reply
+        self.prompt_chars = 0
+
+    def generate_multiturn(self, system_prompt, messages: list[dict], usage: bool = False):
+        self.prompt_chars = len(str(system_prompt)) + sum(len(str(m["content"])) for m in messages)
+        if self.latency:
+            time.sleep(self.latency)
+        if usage:
+            return self.reply, {"input_tokens": self.prompt_chars // 4, "output_tokens": len(self.reply) // 4}
+        return self.reply
+
+
+def _git_commit() -> str | None:
+    """Short commit of the source tree, with `-dirty` for local changes (None outside git)."""
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--abbrev=12"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _latencies(samples: list[float]) -> dict:
+    """p50/p95/p99 and mean of per-call timings, in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) == 1:
+        ms = ms * 2
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "calls": len(samples),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+
+def _best_of(fn: Callable, repeat: int):
+    """Run `fn` `repeat` times; returns (last result, fastest seconds)."""
+    best = float("inf")
+    result = None
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _per_call(fn: Callable, items: list) -> tuple[list, list[float]]:
+    results, samples = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        samples.append(time.perf_counter() - start)
+    return results, samples
+
+
+def _queries(topics: list[str], count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = _words(500, seed)
+    return [
+        f"What did I write about {rng.choice(topics)} and {' '.join(rng.choices(vocabulary, k=2))}?"
+        for _ in range(count)
+    ]
+
+
+def run_bench(
+    config: Config,
+    files: int = 200,
+    headings: int = 4,
+    paragraphs: int = 3,
+    words: int = 60,
+    queries: int = 50,
+    changed: int = 10,
+    repeat: int = 3,
+    llm_latency: float = 0.0,
+    seed: int = 0,
+    output: Path | None = None,
+) -> dict:
+    """Time every stage of ingest and retrieval on a synthetic vault.
+
+    Uses the configured embedding model, chunking and retrieval settings,
+    but a throwaway vault, index and cache, and a stub LLM, so it runs
+    offline and leaves the real index alone. Cheap CPU stages take the
+    best of `repeat` runs. Returns the results and writes them as JSON to
+    `output`.
+    """
+    from .embeddings import EmbeddingService
+    from .vectorstore import VectorStore
+
+    stages: dict[str, dict] = {}
+    # Query caches would turn repeated benchmark runs into cache lookups.
+    embedding = config.embedding.model_copy(update={"query_cache_size": 0, "query_disk_cache": False})
+
+    with tempfile.TemporaryDirectory(prefix="nsie-bench-") as tmp:
+        tmp = Path(tmp)
+        vault = tmp / "vault"
+        bench_config = config.model_copy(update={
+            "paths": PathsConfig(notes_directory=vault, database_directory=tmp / "chroma", cache_directory=tmp / "cache"),
+            "embedding": embedding,
+        })
+
+        with console.status("Generating vault..."):
+            generated = generate_vault(vault, files, headings, paragraphs, words, seed)
+        mb = generated["bytes"] / 1024 / 1024
+        console.print(f"Synthetic vault: {files} notes, {mb:.1f} MB")
+
+        with console.status("Loading embedding model..."):
+            start = time.perf_counter()
+            # The real cache directory keeps converted ONNX models between runs.
+            embedder = EmbeddingService.from_config(config.model_copy(update={"embedding": embedding}))
+            stages["load_model"] = {"seconds": time.perf_counter() - start}
+
+        with console.status("Scanning, hashing and chunking..."):
+            scan, seconds = _best_of(lambda: VaultScanner.from_config(bench_config, vault).scan(), repeat)
+            stages["scan"] = {"seconds": seconds, "files": len(scan.files), "files_per_s": len(scan.files) / seconds}
+
+            hashes, seconds = _best_of(lambda: [_hash_file(p) for p in scan.files], repeat)
+            stages["hash"] = {"seconds": seconds, "mb_per_s": mb / seconds}
+
+            chunker = MarkdownChunker(
+                max_tokens=config.chunking.max_chunk_tokens,
+                overlap_tokens=config.chunking.overlap_tokens,
+            )
+            chunked, seconds = _best_of(
+                lambda: [(str(p), chunker.chunk_file(p, file_hash=h)) for p, h in zip(scan.files, hashes)], repeat
+            )
+            chunks = [c for _, file_chunks in chunked for c in file_chunks]
+            stages["chunk"] = {"seconds": seconds, "chunks": len(chunks), "mb_per_s": mb / seconds}
+
+        with console.status(f"Embedding {len(chunks)} chunks..."):
+            start = time.perf_counter()
+            embeddings = embedder.embed_batch([c.text for c in chunks], show_progress_bar=False)
+            seconds = time.perf_counter() - start
+            stages["embed"] = {"seconds": seconds, "chunks": len(chunks), "chunks_per_s": len(chunks) / seconds}
+
+        with console.status("Writing to the vector store..."):
+            store = VectorStore(bench_config.paths.database_directory)
+            by_id = {c.id: v for c, v in zip(chunks, embeddings)}
+            start = time.perf_counter()
+            for batch in _iter_file_batches(chunked, config.ingest.batch_size):
+                batch_chunks = [c for _, file_chunks in batch for c in file_chunks]
+                store.add_chunks(batch_chunks, [by_id[c.id] for c in batch_chunks])
+            seconds = time.perf_counter() - start
+            stages["add_chunks"] = {"seconds": seconds, "chunks": len(chunks), "chunks_per_s": len(chunks) / seconds}
+
+        with console.status("Re-ingesting..."):
+            services = (embedder, store)
+            start = time.perf_counter()
+            run_ingest(bench_config, vault, workers=1, services=services, quiet=True)
+            stages["reingest_unchanged"] = {"seconds": time.perf_counter() - start, "files": len(scan.files)}
+
+            rng = random.Random(seed)
+            edited = rng.sample(scan.files, min(changed, len(scan.files)))
+            for path in edited:
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(f"\n## Edited\n\n{' '.join(_words(40, rng.randrange(1 << 30)))}\n")
+            start = time.perf_counter()
+            result = run_ingest(bench_config, vault, workers=1, services=services, quiet=True)
+            stages["reingest_changed"] = {
+                "seconds": time.perf_counter() - start,
+                "files": result["files"],
+                "chunks_added": result["added"],
+            }
+
+        questions = _queries(generated["topics"], queries, seed)
+        retrieval = config.retrieval
+        with console.status(f"Running {len(questions)} queries..."):
+            embedder.embed_query(questions[0])  # warm up
+            vectors, samples = _per_call(embedder.embed_query, questions)
+            stages["embed_query"] = _latencies(samples)
+
+            _, samples = _per_call(
+                lambda qv: store.search(
+                    qv[1],
+                    top_k=retrieval.top_k,
+                    query_text=qv[0] if retrieval.hybrid else None,
+                    candidates=retrieval.candidates,
+                    max_postings=retrieval.lexical_max_postings,
+                ),
+                list(zip(questions, vectors)),
+            )
+            stages["search"] = _latencies(samples)
+
+            _, samples = _per_call(
+                lambda vector: store.search_broad(vector, top_k=30, files=retrieval.broad_files), vectors
+            )
+            stages["search_broad"] = _latencies(samples)
+
+            llm = StubLLM(latency=llm_latency)
+
+            def ask(question: str) -> int:
+                query_embedding = embedder.embed_query(question)
+                found = store.search(
+                    query_embedding,
+                    top_k=retrieval.top_k,
+                    query_text=question if retrieval.hybrid else None,
+                    candidates=retrieval.candidates,
+                    max_postings=retrieval.lexical_max_postings,
+                )
+                passages, context = pack_context(found, embedder.count_tokens, retrieval.context_token_budget)
+                messages = [{"role": "user", "content": build_user_prompt(question, passages)}]
+                llm.generate_multiturn(SYSTEM_PROMPT, messages)
+                return context["tokens_after"]
+
+            # Reworded so the ask path embeds its own questions.
+            context_tokens, samples = _per_call(ask, [f"{q} Explain." for q in questions])
+            stages["ask_stub_llm"] = {
+                **_latencies(samples),
+                "llm_latency_ms": llm_latency * 1000,
+                "context_tokens_mean": statistics.fmean(context_tokens),
+            }
+        embedder.close()
+
+    results = {
+        "version": RESULTS_VERSION,
+        "commit": _git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()},
+        "vault": {
+            "files": files,
+            "headings": headings,
+            "paragraphs": paragraphs,
+            "words": words,
+            "bytes": generated["bytes"],
+            "seed": seed,
+        },
+        "config": {
+            "model": config.embedding.model,
+            "backend": config.embedding.backend,
+            "quantize": config.embedding.quantize,
+            "embedding_batch_size": config.embedding.batch_size,
+            "max_chunk_tokens": config.chunking.max_chunk_tokens,
+            "ingest_batch_size": config.ingest.batch_size,
+            "top_k": retrieval.top_k,
+            "hybrid": retrieval.hybrid,
+        },
+        "stages": {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()} for name, s in stages.items()},
+    }
+    _print_results(results)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+        console.print(f"\nResults written to [bold]{output}[/bold]")
+    return results
+
+
+def _print_results(results: dict):
+    table = Table(title=f"nsie bench @ {results['commit'] or 'unknown commit'}", title_justify="left")
+    table.add_column("Stage")
+    table.add_column("Time", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("Throughput", justify="right")
+    for name, stage in results["stages"].items():
+        if "p50_ms" in stage:
+            table.add_row(name, f"p50 {stage['p50_ms']:.1f} ms", f"{stage['p95_ms']:.1f} ms", f"{stage['p99_ms']:.1f} ms", "")
+            continue
+        rate = next((f"{stage[k]:,.1f} {unit}" for k, unit in _RATE_UNITS.items() if k in stage), "")
+        table.add_row(name, f"{stage['seconds'] * 1000:,.1f} ms", "", "", rate)
+    console.print()
+    console.print(table)
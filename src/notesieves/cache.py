@@ -0,0 +1,230 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk embedding cache.
+
+    Vectors are stored as float32 blobs in SQLite, keyed by (model, SHA-256
+    of the text), so identical chunk text is embedded once no matter which
+    file or position it comes from. `evict()` trims the least recently used
+    entries once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, path: Path, model: str, max_bytes: int = 512 * 1024 * 1024):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.max_bytes = max_bytes
+        # The daemon calls in from several threads, one at a time.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_sha TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL,"
+            " PRIMARY KEY (model, text_sha))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    @classmethod
+    def from_config(cls, config) -> "EmbeddingCache":
+        """Open the cache for the configured embedding model and backend."""
+        model = f"{config.embedding.model}:{config.embedding.backend}"
+        if config.embedding.backend == "onnx" and config.embedding.quantize:
+            model += ":int8"
+        return cls(
+            config.paths.cache_directory / "embeddings.sqlite3",
+            model,
+            max_bytes=config.cache.embedding_max_mb * 1024 * 1024,
+        )
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        """Return the cached vector for each text, or None where missing."""
+        keys = [_text_key(t) for t in texts]
+        found: dict[str, list[float]] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT text_sha, vector FROM embeddings WHERE model = ? AND text_sha IN ({placeholders})",
+                [self.model, *batch],
+            )
+            found.update((sha, _unpack(blob)) for sha, blob in rows)
+
+        if found:
+            now = time.time_ns()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_sha = ?",
+                [(now, self.model, sha) for sha in found],
+            )
+            self.conn.commit()
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]):
+        """Store freshly computed vectors."""
+        now = time.time_ns()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_sha, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.model, _text_key(t), _pack(v), now) for t, v in zip(texts, vectors)],
+        )
+        self.conn.commit()
+
+    def size_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def entry_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def bump(self, counts: dict[str, int]):
+        """Add to persistent usage counters (kept across runs for `nsie status`)."""
+        self.conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, n) for name, n in counts.items() if n],
+        )
+        self.conn.commit()
+
+    def counters(self) -> dict[str, int]:
+        return dict(self.conn.execute("SELECT name, value FROM counters"))
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        excess = self.size_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        doomed = []
+        rows = self.conn.execute("SELECT model, text_sha, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        for model, sha, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((model, sha))
+            excess -= size
+        self.conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_sha = ?", doomed)
+        self.conn.commit()
+        return len(doomed)
+
+    def close(self):
+        self.conn.close()
+
+
+def answer_key(
+    question: str,
+    mode: str,
+    model: str,
+    prompt_version: int,
+    sources: list,
+    context_budget: int,
+) -> str:
+    """Cache key for an answer.
+
+    Covers the normalized question, the mode, the model, the prompt version,
+    what retrieval returned (chunk IDs with their file hashes, or the broad
+    file→headings map) and the context token budget that decides which of
+    those passages reach the prompt, so editing any retrieved note or
+    changing the budget changes the key.
+    """
+    normalized = re.sub(r"\s+", " ", question).strip().rstrip("?!.").strip().lower()
+    payload = [normalized, mode, model, prompt_version, sources, context_budget]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """On-disk cache of generated answers for `nsie ask`.
+
+    Entries older than `ttl_seconds` are never returned; `evict()` drops
+    expired entries and then the least recently used ones until the cache
+    fits in `max_bytes`.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float, max_bytes: int = 64 * 1024 * 1024):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " answer TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self.conn.commit()
+
+    @classmethod
+    def from_config(cls, config) -> "AnswerCache":
+        return cls(
+            config.paths.cache_directory / "answers.sqlite3",
+            ttl_seconds=config.cache.answer_ttl_hours * 3600,
+            max_bytes=config.cache.answer_max_mb * 1024 * 1024,
+        )
+
+    def get(self, key: str) -> str | None:
+        """Return the cached answer for `key` if it exists and has not expired."""
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT answer FROM answers WHERE key = ? AND created_at > ?",
+            (key, now - self.ttl_seconds),
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        return row[0]
+
+    def put(self, key: str, answer: str):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO answers (key, answer, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, answer, now, now),
+        )
+        self.conn.commit()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over max_bytes."""
+        removed = self.conn.execute(
+            "DELETE FROM answers WHERE created_at <= ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+
+        size = self.conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(answer AS BLOB))), 0) FROM answers").fetchone()[0]
+        excess = size - self.max_bytes
+        if excess > 0:
+            doomed = []
+            rows = self.conn.execute("SELECT key, LENGTH(CAST(answer AS BLOB)) FROM answers ORDER BY last_used")
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            self.conn.executemany("DELETE FROM answers WHERE key = ?", doomed)
+            removed += len(doomed)
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.conn.close()
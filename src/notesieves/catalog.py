@@ -0,0 +1,102 @@
+import sqlite3
+import time
+from pathlib import Path
+
+
+def catalog_path(persist_directory: Path, collection_name: str = "notes") -> Path:
+    """Location of the catalog for a collection in a Chroma directory."""
+    return persist_directory / f"{collection_name}.catalog.sqlite3"
+
+
+class FileCatalog:
+    """Per-file side table kept next to the Chroma collection.
+
+    One row per indexed file (path, name, hash, chunk count, mtime, last
+    indexed time), so listing notes and change detection never have to load
+    every chunk's metadata. A row whose hash is NULL is mid-update: the
+    store marks a file pending before touching its chunks and records the
+    new hash only after Chroma accepted the write, so an interrupted update
+    shows up as a changed file on the next ingest.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " hash TEXT,"
+            " chunk_count INTEGER NOT NULL DEFAULT 0,"
+            " mtime REAL,"
+            " indexed_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_name ON files (name)")
+        self.conn.commit()
+
+    def mark_pending(self, paths: list[str]):
+        """Flag files as mid-update before their chunks are modified."""
+        self.conn.executemany(
+            "INSERT INTO files (path, name) VALUES (?, ?)"
+            " ON CONFLICT(path) DO UPDATE SET hash = NULL",
+            [(p, Path(p).stem) for p in paths],
+        )
+        self.conn.commit()
+
+    def record(self, rows: list[dict]):
+        """Record files whose chunks were written successfully.
+
+        Each row has path, name, hash, chunk_count and mtime.
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO files (path, name, hash, chunk_count, mtime, indexed_at)"
+            " VALUES (:path, :name, :hash, :chunk_count, :mtime, :indexed_at)",
+            [{**row, "indexed_at": now} for row in rows],
+        )
+        self.conn.commit()
+
+    def remove(self, paths: list[str]):
+        self.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM files")
+        self.conn.commit()
+
+    def hashes(self) -> dict[str, str]:
+        """Return file_path → file_hash; pending files map to ""."""
+        return {path: fh or "" for path, fh in self.conn.execute("SELECT path, hash FROM files")}
+
+    def names(self) -> list[str]:
+        """Return sorted unique note names."""
+        return [name for (name,) in self.conn.execute("SELECT DISTINCT name FROM files ORDER BY name")]
+
+    def match(self, pattern: str) -> list[str]:
+        """Return the paths matching a shell-style glob (`*` also crosses folders)."""
+        return [path for (path,) in self.conn.execute("SELECT path FROM files WHERE path GLOB ? ORDER BY path", (pattern,))]
+
+    def iter_files(self):
+        """Yield one dict per file, streamed from the database."""
+        cursor = self.conn.execute(
+            "SELECT path, name, hash, chunk_count, mtime, indexed_at FROM files ORDER BY path"
+        )
+        for path, name, fh, chunk_count, mtime, indexed_at in cursor:
+            yield {
+                "path": path,
+                "name": name,
+                "hash": fh,
+                "chunk_count": chunk_count,
+                "mtime": mtime,
+                "indexed_at": indexed_at,
+            }
+
+    def totals(self) -> tuple[int, int]:
+        """Return (file count, chunk count)."""
+        files, chunks = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM files").fetchone()
+        return files, chunks
+
+    def close(self):
+        self.conn.close()
@@ -1,12 +1,27 @@
+import hashlib
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from itertools import chain, groupby
+from operator import itemgetter
 from pathlib import Path
 
+_HEADING_RE = re.compile(r"(#{1,6})\s+(.+)")
+# Opening/closing code fence: ``` or ~~~ (3 or more), indented at most 3 spaces.
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+
 
 @dataclass
 class Chunk:
     text: str
     metadata: dict
+    id: str = ""
+
+
+def chunk_id(file_path: str, heading_hierarchy: str, text: str) -> str:
+    """Stable ID derived from a chunk's file path, section and content."""
+    key = f"{file_path}\0{heading_hierarchy}\0{text}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:24]
 
 
 class MarkdownChunker:
@@ -16,116 +31,150 @@ class MarkdownChunker:
 
     def chunk_file(self, file_path: Path, file_hash: str = "") -> list[Chunk]:
         """Main entry point: file → list of chunks."""
-        content = file_path.read_text(encoding="utf-8")
-        file_name = file_path.stem
-
-        sections = self._parse_sections(content)
-
-        chunks = []
-        for section in sections:
-            section_chunks = self._chunk_section(section, file_path, file_name)
-            chunks.extend(section_chunks)
-
-        for i, chunk in enumerate(chunks):
-            chunk.metadata["chunk_index"] = i
+        chunks = list(self.iter_chunks(file_path, file_hash))
+        for chunk in chunks:
             chunk.metadata["total_chunks_in_file"] = len(chunks)
-            chunk.metadata["file_hash"] = file_hash
-
         return chunks
 
-    def _parse_sections(self, content: str) -> list[dict]:
-        """Split content by markdown headings, preserving hierarchy."""
-        heading_pattern = re.compile(r"^(#{1,6})\s+(.+)$", re.MULTILINE)
-        sections = []
-        current_hierarchy = []
-        last_end = 0
-
-        for match in heading_pattern.finditer(content):
-            text_before = content[last_end:match.start()]
-            if text_before.strip():
-                sections.append({
-                    "heading_hierarchy": current_hierarchy.copy(),
-                    "content": text_before.strip(),
-                })
-
-            level = len(match.group(1))
-            heading_text = match.group(2)
-            current_hierarchy = current_hierarchy[:level - 1]
-            current_hierarchy.append(heading_text)
-
-            last_end = match.end()
-
-        remaining = content[last_end:]
-        if remaining.strip():
-            sections.append({
-                "heading_hierarchy": current_hierarchy.copy(),
-                "content": remaining.strip(),
-            })
-
-        return sections
-
-    def _chunk_section(self, section: dict, file_path: Path, file_name: str) -> list[Chunk]:
-        """Split a section into chunks if too large."""
-        content = section["content"]
-        hierarchy = section["heading_hierarchy"]
-
-        if self._estimate_tokens(content) <= self.max_tokens:
-            return [Chunk(
-                text=content,
-                metadata={
-                    "file_path": str(file_path),
-                    "file_name": file_name,
-                    "heading_hierarchy": " > ".join(hierarchy),
-                },
-            )]
-
-        paragraphs = content.split("\n\n")
-        chunks = []
-        current_parts = []
-        current_tokens = 0
-
+    def iter_chunks(self, file_path: Path, file_hash: str = "") -> Iterator[Chunk]:
+        """Yield a file's chunks as they are found, reading it line by line.
+
+        Memory stays proportional to the largest chunk rather than the file.
+        `total_chunks_in_file` is only known at the end, so it is left to
+        `chunk_file`.
+        """
+        path = str(file_path)
+        base_metadata = {
+            "file_path": path,
+            "file_name": file_path.stem,
+            "file_hash": file_hash,
+            "folder": str(file_path.parent),
+        }
+        seen: dict[str, int] = {}
+        index = 0
+
+        with file_path.open(encoding="utf-8") as f:
+            for _, section in groupby(self._iter_paragraphs(f), key=itemgetter(0)):
+                _, hierarchy, first = next(section)
+                paragraphs = chain((first,), (paragraph for _, _, paragraph in section))
+                for text in self._chunk_section(paragraphs):
+                    # Identical sections within one file get an occurrence suffix
+                    base_id = chunk_id(path, hierarchy, text)
+                    occurrence = seen.get(base_id, 0)
+                    seen[base_id] = occurrence + 1
+                    yield Chunk(
+                        text=text,
+                        metadata={**base_metadata, "heading_hierarchy": hierarchy, "chunk_index": index},
+                        id=f"{base_id}-{occurrence}" if occurrence else base_id,
+                    )
+                    index += 1
+
+    def _iter_paragraphs(self, lines: Iterable[str]) -> Iterator[tuple[int, str, str]]:
+        """Split markdown into sections by heading and sections into paragraphs.
+
+        Yields (section number, heading hierarchy, paragraph) in a single
+        pass. Paragraphs are what `content.split("\\n\\n")` gives for each
+        section's stripped content; sections with no content yield nothing.
+        `#` lines inside fenced code blocks are not headings.
+        """
+        section = 0
+        hierarchy: list[str] = []
+        heading = ""
+        fence = None  # opening marker of the code block we are in
+        current: list[str] = []  # lines of the paragraph being read
+        # The last finished paragraph with text, plus any blank ones after it:
+        # held back until more text shows they are not trailing whitespace.
+        held: list[str] = []
+
+        for line in lines:
+            if fence is None and line.startswith("#"):
+                match = _HEADING_RE.match(line.rstrip("\n"))
+                if match:
+                    yield from ((section, heading, p) for p in self._section_tail(held, current))
+                    section += 1
+                    held, current = [], []
+                    level = len(match.group(1))
+                    hierarchy = hierarchy[:level - 1]
+                    hierarchy.append(match.group(2))
+                    heading = " > ".join(hierarchy)
+                    continue
+
+            marker = _FENCE_RE.match(line) if line[0] in "`~ " else None
+            if marker:
+                run = marker.group(1)
+                if fence is None:
+                    fence = run
+                elif run[0] == fence[0] and len(run) >= len(fence) and not line[marker.end():].strip():
+                    fence = None  # a closing fence has nothing after the marker
+
+            if not current and not held:
+                if not line.strip():
+                    continue  # leading whitespace of the section
+                line = line.lstrip()
+
+            if line == "\n" and current and current[-1].endswith("\n"):
+                paragraph = "".join(current)[:-1]
+                current = []
+                if paragraph.strip():
+                    yield from ((section, heading, p) for p in held)
+                    held = [paragraph]
+                else:
+                    held.append(paragraph)
+                continue
+            current.append(line)
+
+        yield from ((section, heading, p) for p in self._section_tail(held, current))
+
+    @staticmethod
+    def _section_tail(held: list[str], current: list[str]) -> list[str]:
+        """The paragraphs left at the end of a section, trailing whitespace stripped."""
+        last = "".join(current)
+        if last.strip():
+            return [*held, last.rstrip()]
+        return [held[0].rstrip()] if held else []
+
+    def _chunk_section(self, paragraphs: Iterator[str]) -> Iterator[str]:
+        """Yield a section's chunk texts: the whole section if small enough."""
+        head = []
+        length = -2  # "\n\n".join(head) is 2 chars per paragraph, minus one separator
+        for paragraph in paragraphs:
+            head.append(paragraph)
+            length += len(paragraph) + 2
+            if length // 4 > self.max_tokens:
+                yield from self._pack(chain(head, paragraphs))
+                return
+        if head:
+            yield "\n\n".join(head)
+
+    def _pack(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        """Greedily pack paragraphs into chunks of up to max_tokens, with overlap."""
+        parts: list[str] = []
+        tokens = 0
         for paragraph in paragraphs:
             para_tokens = self._estimate_tokens(paragraph)
 
-            if current_tokens + para_tokens > self.max_tokens and current_parts:
-                chunks.append(Chunk(
-                    text="\n\n".join(current_parts),
-                    metadata={
-                        "file_path": str(file_path),
-                        "file_name": file_name,
-                        "heading_hierarchy": " > ".join(hierarchy),
-                    },
-                ))
-                overlap_parts = self._get_overlap_parts(current_parts)
-                current_parts = overlap_parts
-                current_tokens = self._estimate_tokens("\n\n".join(overlap_parts))
-
-            current_parts.append(paragraph)
-            current_tokens += para_tokens
-
-        if current_parts:
-            chunks.append(Chunk(
-                text="\n\n".join(current_parts),
-                metadata={
-                    "file_path": str(file_path),
-                    "file_name": file_name,
-                    "heading_hierarchy": " > ".join(hierarchy),
-                },
-            ))
+            if tokens + para_tokens > self.max_tokens and parts:
+                yield "\n\n".join(parts)
+                parts = self._get_overlap_parts(parts)
+                tokens = (sum(map(len, parts)) + 2 * (len(parts) - 1)) // 4
 
-        return chunks
+            parts.append(paragraph)
+            tokens += para_tokens
+
+        if parts:
+            yield "\n\n".join(parts)
 
     def _get_overlap_parts(self, parts: list[str]) -> list[str]:
         """Get trailing paragraphs that fit within overlap_tokens."""
-        overlap = []
+        start = len(parts)
         tokens = 0
-        for part in reversed(parts):
-            part_tokens = self._estimate_tokens(part)
-            if tokens + part_tokens > self.overlap_tokens and overlap:
+        while start > 0:
+            part_tokens = self._estimate_tokens(parts[start - 1])
+            if tokens + part_tokens > self.overlap_tokens and start < len(parts):
                 break
-            overlap.insert(0, part)
+            start -= 1
             tokens += part_tokens
-        return overlap
+        return parts[start:]
 
     def _estimate_tokens(self, text: str) -> int:
         """Rough token estimate: ~4 chars per token for English."""
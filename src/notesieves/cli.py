@@ -1,12 +1,12 @@
+import sys
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
-import anthropic
 import typer
 from rich.console import Console
 
-from .config import load_config
-from .ingest import run_ingest
-from .query import run_query, run_quiz
+from .daemon import DaemonError, connect, run_serve
 
 app = typer.Typer(
     name="notesieves",
@@ -17,6 +17,8 @@ console = Console()
 
 def _load_config_or_exit():
     """Load config, exit with a helpful message if it fails."""
+    from .config import load_config
+
     try:
         return load_config()
     except FileNotFoundError:
@@ -28,10 +30,117 @@ def _load_config_or_exit():
         raise typer.Exit(1)
 
 
+_INVALID_KEY = "[red]Invalid API key.[/red] Check ANTHROPIC_API_KEY in your .env file."
+_NO_CONNECTION = "[red]Could not connect to the Anthropic API.[/red] Check your internet connection."
+
+# The daemon reports only an exception's class name, so its API errors are
+# recognised by name.
+_DAEMON_API_ERRORS = {
+    "AuthenticationError": _INVALID_KEY,
+    "APIConnectionError": _NO_CONNECTION,
+    "APITimeoutError": _NO_CONNECTION,
+}
+
+
+@contextmanager
+def _handle_service_errors():
+    """Turn API and daemon failures into a message and a non-zero exit.
+
+    `anthropic` is only consulted when something already imported it, so
+    commands that never reach the LLM don't pay for loading it.
+    """
+    try:
+        yield
+    except DaemonError as e:
+        console.print(_DAEMON_API_ERRORS.get(e.kind) or f"[red]Daemon error:[/red] {e}")
+        raise typer.Exit(1)
+    except Exception as e:
+        anthropic = sys.modules.get("anthropic")
+        if anthropic is not None and isinstance(e, anthropic.AuthenticationError):
+            console.print(_INVALID_KEY)
+            raise typer.Exit(1)
+        if anthropic is not None and isinstance(e, anthropic.APIConnectionError):
+            console.print(_NO_CONNECTION)
+            raise typer.Exit(1)
+        raise
+
+
+@contextmanager
+def _tracing(command: str, profile: bool, trace_json: Optional[Path]):
+    """Collect spans for the block when `--profile` or `--trace-json` is given, then report them."""
+    if not profile and trace_json is None:
+        yield
+        return
+
+    from . import trace
+
+    tracer = trace.start()
+    try:
+        with trace.span(command):
+            yield
+    finally:
+        trace.stop()
+        if profile:
+            trace.print_profile(tracer, console)
+        if trace_json is not None:
+            tracer.write_chrome_trace(trace_json)
+            console.print(f"[dim]Trace written to {trace_json}[/dim]")
+
+
+def _note_filters(
+    config,
+    path: Optional[str],
+    heading: Optional[str],
+    since: Optional[str],
+    file: Optional[str],
+) -> Optional[dict]:
+    """Build retrieval filters from the --path/--heading/--since/--file options."""
+    filters = {}
+    if path:
+        # Relative globs are taken from the notes directory, like ingest paths.
+        pattern = Path(path).expanduser()
+        if not pattern.is_absolute():
+            pattern = config.paths.notes_directory.expanduser().resolve() / pattern
+        filters["path"] = str(pattern) + ("/*" if path.endswith("/") else "")
+    if heading:
+        filters["heading"] = heading
+    if since:
+        from datetime import datetime
+
+        try:
+            filters["since"] = datetime.fromisoformat(since).timestamp()
+        except ValueError:
+            console.print(f"[red]Invalid date for --since:[/red] {since} (expected YYYY-MM-DD)")
+            raise typer.Exit(1)
+    if file:
+        filters["file"] = file
+    return filters or None
+
+
+def _open_catalog(config):
+    """Open the per-file catalog without going through Chroma.
+
+    The catalog is created (or migrated from an older index) by the store,
+    so the first call on a fresh database opens the store once.
+    """
+    from .catalog import FileCatalog, catalog_path
+
+    path = catalog_path(config.paths.database_directory)
+    if not path.exists() and connect(config) is None:
+        from .vectorstore import VectorStore
+
+        VectorStore(config.paths.database_directory)
+    return FileCatalog(path)
+
+
 @app.command()
 def ingest(
     path: str = typer.Argument(..., help="Path to markdown directory"),
     clear: bool = typer.Option(False, "--clear", "-c", help="Clear existing index first"),
+    verify: bool = typer.Option(False, "--verify", help="Re-hash every file instead of trusting unchanged size/mtime"),
+    workers: int = typer.Option(None, "--workers", "-w", help="Processes for hashing and chunking (default: ingest.workers)"),
+    profile: bool = typer.Option(False, "--profile", help="Print time spent in each stage"),
+    trace_json: Optional[Path] = typer.Option(None, "--trace-json", help="Write a Chrome trace (chrome://tracing, Perfetto) to this file"),
 ):
     """Index markdown files from a directory."""
     config = _load_config_or_exit()
@@ -41,42 +150,99 @@ def ingest(
         console.print(f"[red]Directory not found:[/red] {notes_path}")
         raise typer.Exit(1)
 
-    run_ingest(config, notes_path, clear=clear)
+    from .ingest import run_ingest
+
+    with _handle_service_errors(), _tracing("ingest", profile, trace_json):
+        run_ingest(config, notes_path, clear=clear, verify=verify, workers=workers)
+
+
+@app.command()
+def watch(
+    path: Optional[str] = typer.Argument(None, help="Path to markdown directory (default: paths.notes_directory)"),
+    poll: bool = typer.Option(False, "--poll", help="Poll instead of using filesystem events (network drives)"),
+):
+    """Keep the index up to date as notes are saved, moved or deleted."""
+    config = _load_config_or_exit()
+    notes_path = Path(path or config.paths.notes_directory).expanduser().resolve()
+
+    if not notes_path.is_dir():
+        console.print(f"[red]Directory not found:[/red] {notes_path}")
+        raise typer.Exit(1)
+
+    from .watch import run_watch
+
+    with _handle_service_errors():
+        run_watch(config, notes_path, poll=poll)
 
 
 @app.command()
 def ask(
-    question: str = typer.Argument(..., help="Your question about the notes"),
+    question: Optional[str] = typer.Argument(None, help="Your question about the notes"),
     broad: bool = typer.Option(False, "--broad", "-b", help="Broad mode: find relevant notes instead of detailed answers"),
+    timing: bool = typer.Option(False, "--timing", "-t", help="Report retrieval time, time to first token and token usage"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached answers and refresh the cache"),
+    batch: Optional[Path] = typer.Option(None, "--batch", help="Answer every question in a JSONL file", exists=True, dir_okay=False),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Batch results file (default: <batch>.answers.jsonl)"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Concurrent LLM requests in batch mode"),
+    path: Optional[str] = typer.Option(None, "--path", "-p", help="Only notes whose path matches a glob, e.g. 'projects/*'"),
+    heading: Optional[str] = typer.Option(None, "--heading", help="Only sections whose heading contains this text"),
+    since: Optional[str] = typer.Option(None, "--since", help="Only notes modified on or after a date (YYYY-MM-DD)"),
+    file: Optional[str] = typer.Option(None, "--file", "-f", help="Only the note with this name"),
+    profile: bool = typer.Option(False, "--profile", help="Print time spent in each stage"),
+    trace_json: Optional[Path] = typer.Option(None, "--trace-json", help="Write a Chrome trace (chrome://tracing, Perfetto) to this file"),
 ):
     """Ask a question about your indexed notes."""
+    if (question is None) == (batch is None):
+        console.print("[red]Give either a question or --batch FILE.[/red]")
+        raise typer.Exit(1)
+
     config = _load_config_or_exit()
+    filters = _note_filters(config, path, heading, since, file)
 
-    try:
-        run_query(config, question, broad=broad)
-    except anthropic.AuthenticationError:
-        console.print("[red]Invalid API key.[/red] Check ANTHROPIC_API_KEY in your .env file.")
-        raise typer.Exit(1)
-    except anthropic.APIConnectionError:
-        console.print("[red]Could not connect to the Anthropic API.[/red] Check your internet connection.")
-        raise typer.Exit(1)
+    if batch is not None:
+        from .batch import BatchFileError, run_batch
+
+        try:
+            with _handle_service_errors(), _tracing("ask", profile, trace_json):
+                run_batch(
+                    config,
+                    batch,
+                    output or batch.with_suffix(".answers.jsonl"),
+                    broad=broad,
+                    concurrency=concurrency,
+                    use_cache=not no_cache,
+                    filters=filters,
+                )
+        except BatchFileError as e:
+            console.print(f"[red]Invalid batch file:[/red] {e}")
+            raise typer.Exit(1)
+        return
+
+    from .query import run_query
+
+    with _handle_service_errors(), _tracing("ask", profile, trace_json):
+        run_query(config, question, broad=broad, timing=timing, use_cache=not no_cache, filters=filters)
 
 
 @app.command()
 def quiz(
     topic: str = typer.Argument(..., help="Topic to be quizzed on"),
+    timing: bool = typer.Option(False, "--timing", "-t", help="Report latency and prompt-cache usage for each reply"),
+    path: Optional[str] = typer.Option(None, "--path", "-p", help="Only notes whose path matches a glob, e.g. 'projects/*'"),
+    heading: Optional[str] = typer.Option(None, "--heading", help="Only sections whose heading contains this text"),
+    since: Optional[str] = typer.Option(None, "--since", help="Only notes modified on or after a date (YYYY-MM-DD)"),
+    file: Optional[str] = typer.Option(None, "--file", "-f", help="Only the note with this name"),
+    profile: bool = typer.Option(False, "--profile", help="Print time spent in each stage"),
+    trace_json: Optional[Path] = typer.Option(None, "--trace-json", help="Write a Chrome trace (chrome://tracing, Perfetto) to this file"),
 ):
     """Start an interactive quiz on a topic from your notes."""
     config = _load_config_or_exit()
+    filters = _note_filters(config, path, heading, since, file)
 
-    try:
-        run_quiz(config, topic)
-    except anthropic.AuthenticationError:
-        console.print("[red]Invalid API key.[/red] Check ANTHROPIC_API_KEY in your .env file.")
-        raise typer.Exit(1)
-    except anthropic.APIConnectionError:
-        console.print("[red]Could not connect to the Anthropic API.[/red] Check your internet connection.")
-        raise typer.Exit(1)
+    from .query import run_quiz
+
+    with _handle_service_errors(), _tracing("quiz", profile, trace_json):
+        run_quiz(config, topic, timing=timing, filters=filters)
 
 
 @app.command(name="list")
@@ -84,10 +250,7 @@ def list_notes():
     """List all indexed note titles."""
     config = _load_config_or_exit()
 
-    from .vectorstore import VectorStore
-
-    store = VectorStore(config.paths.database_directory)
-    sources = store.list_sources()
+    sources = _open_catalog(config).names()
 
     if not sources:
         console.print("[yellow]No notes indexed yet. Run 'nsie ingest <path>' first.[/yellow]")
@@ -99,24 +262,155 @@ def list_notes():
     console.print()
 
 
+def _query_hit_rate(stats: dict, prefix: str = "") -> str:
+    memory = stats.get(f"{prefix}memory_hits", 0)
+    disk = stats.get(f"{prefix}disk_hits", 0)
+    lookups = memory + disk + stats.get(f"{prefix}misses", 0)
+    if not lookups:
+        return "no lookups yet"
+    return f"{memory + disk}/{lookups} hits ({(memory + disk) / lookups:.0%}: {memory} memory, {disk} disk)"
+
+
 @app.command()
-def status():
+def status(
+    files: bool = typer.Option(False, "--files", "-f", help="List per-file statistics"),
+):
     """Show index statistics."""
     config = _load_config_or_exit()
 
-    from .vectorstore import VectorStore
-
-    store = VectorStore(config.paths.database_directory)
-    count = store.count()
+    client = connect(config)
+    catalog = _open_catalog(config)
+    file_count, count = catalog.totals()
 
     console.print()
     console.print("[bold]NoteSieves Index Status[/bold]")
     console.print(f"  Notes directory:    {config.paths.notes_directory}")
     console.print(f"  Database directory: {config.paths.database_directory}")
+    console.print(f"  Files indexed:      {file_count}")
     console.print(f"  Chunks indexed:     {count}")
+
+    embedding_cache_path = config.paths.cache_directory / "embeddings.sqlite3"
+    if embedding_cache_path.exists():
+        from .cache import EmbeddingCache
+
+        cache = EmbeddingCache.from_config(config)
+        console.print(
+            f"  Embedding cache:    {cache.entry_count()} vectors ({cache.size_bytes() / 1024 / 1024:.1f} MB)"
+        )
+        counters = cache.counters()
+        cache.close()
+        console.print(f"  Query cache:        {_query_hit_rate(counters, prefix='query_')}")
+
+    if client is not None:
+        console.print(f"  Daemon:             running (pid {client.info['pid']})")
+        stats = client.embedder.query_cache_stats()
+        console.print(
+            f"  Daemon query cache: {_query_hit_rate(stats)}, {stats['memory_entries']} in memory"
+        )
+    else:
+        console.print("  Daemon:             not running")
     if count == 0:
         console.print("\n  [yellow]No notes indexed yet. Run 'nsie ingest <path>' first.[/yellow]")
+
+    if files and file_count:
+        from datetime import datetime
+
+        console.print(f"\n  {'Chunks':>6}  {'Modified':<16}  {'Indexed':<16}  Path")
+        for row in catalog.iter_files():
+            modified = datetime.fromtimestamp(row["mtime"]).strftime("%Y-%m-%d %H:%M") if row["mtime"] else "-"
+            indexed = datetime.fromtimestamp(row["indexed_at"]).strftime("%Y-%m-%d %H:%M") if row["indexed_at"] else "-"
+            pending = " [yellow](pending)[/yellow]" if row["hash"] is None else ""
+            console.print(f"  {row['chunk_count']:>6}  {modified:<16}  {indexed:<16}  {row['path']}{pending}", highlight=False)
+    console.print()
+
+
+@app.command()
+def parity(
+    tolerance: float = typer.Option(0.05, help="Max allowed difference between cosine similarities"),
+    quantize: bool = typer.Option(None, "--quantize/--no-quantize", help="Check the int8 ONNX model (default: embedding.quantize)"),
+    samples: int = typer.Option(64, help="Number of note chunks to compare"),
+):
+    """Check that the torch and ONNX embedding backends agree."""
+    config = _load_config_or_exit()
+
+    from .chunker import MarkdownChunker
+    from .embeddings import check_parity
+    from .scanner import VaultScanner
+
+    notes_path = config.paths.notes_directory.expanduser()
+    chunker = MarkdownChunker(
+        max_tokens=config.chunking.max_chunk_tokens,
+        overlap_tokens=config.chunking.overlap_tokens,
+    )
+    texts = []
+    for file_path in VaultScanner.from_config(config, notes_path).scan().files:
+        texts.extend(chunk.text for chunk in chunker.chunk_file(file_path))
+        if len(texts) >= samples:
+            break
+    texts = texts[:samples]
+    if len(texts) < 2:
+        console.print(f"[red]Need at least two note chunks in {notes_path} to compare.[/red]")
+        raise typer.Exit(1)
+
+    quantize = config.embedding.quantize if quantize is None else quantize
+    with console.status("Embedding with both backends..."):
+        result = check_parity(
+            config.embedding.model,
+            texts,
+            quantize=quantize,
+            cache_dir=config.paths.cache_directory,
+        )
+
+    delta = result["max_similarity_delta"]
     console.print()
+    console.print(f"[bold]Embedding parity: torch vs onnx{' (int8)' if quantize else ''}[/bold]")
+    console.print(f"  Texts compared:          {len(texts)}")
+    console.print(f"  Min vector cosine:       {result['min_vector_cosine']:.4f}")
+    console.print(f"  Max similarity delta:    {delta:.4f} (tolerance {tolerance})")
+    if delta > tolerance:
+        console.print("\n  [red]Backends disagree beyond tolerance.[/red]\n")
+        raise typer.Exit(1)
+    console.print("\n  [green]Backends agree.[/green]\n")
+
+
+@app.command()
+def bench(
+    files: int = typer.Option(200, "--files", help="Notes in the synthetic vault"),
+    headings: int = typer.Option(4, "--headings", help="Sections per note"),
+    paragraphs: int = typer.Option(3, "--paragraphs", help="Paragraphs per section"),
+    words: int = typer.Option(60, "--words", help="Average words per paragraph"),
+    queries: int = typer.Option(50, "--queries", "-q", min=1, help="Queries for the search and ask latencies"),
+    changed: int = typer.Option(10, "--changed", help="Notes edited before the incremental re-ingest"),
+    repeat: int = typer.Option(3, "--repeat", help="Runs of the scan, hash and chunk stages (best is kept)"),
+    llm_latency: float = typer.Option(0.0, "--llm-latency", help="Seconds the stub LLM waits before answering"),
+    seed: int = typer.Option(0, "--seed", help="Seed for the synthetic vault and queries"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write results as JSON to this file"),
+):
+    """Benchmark each ingest and retrieval stage on a synthetic vault (offline)."""
+    config = _load_config_or_exit()
+
+    from .bench import run_bench
+
+    run_bench(
+        config,
+        files=files,
+        headings=headings,
+        paragraphs=paragraphs,
+        words=words,
+        queries=queries,
+        changed=changed,
+        repeat=repeat,
+        llm_latency=llm_latency,
+        seed=seed,
+        output=output,
+    )
+
+
+@app.command()
+def serve():
+    """Run a resident daemon that keeps the model and index loaded."""
+    config = _load_config_or_exit()
+    run_serve(config)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 class PathsConfig(BaseModel):
     notes_directory: Path
     database_directory: Path = Path("./data/chroma")
+    cache_directory: Path = Path("./data/cache")
 
 
 class ChunkingConfig(BaseModel):
@@ -15,21 +16,65 @@ class ChunkingConfig(BaseModel):
     split_on_headings: bool = True
 
 
+class IngestConfig(BaseModel):
+    batch_size: int = 256
+    workers: int = 1
+    extensions: list[str] = [".md"]
+    exclude: list[str] = [".git/", ".obsidian/", ".trash/", "node_modules/"]
+    gitignore: bool = True
+    scan_threads: int = 1
+    watch_debounce_ms: int = 300
+    watch_poll_seconds: float = 2.0
+
+
+class EmbeddingConfig(BaseModel):
+    model: str = "all-MiniLM-L6-v2"
+    batch_size: int = 32
+    processes: int = 0
+    backend: str = "torch"
+    quantize: bool = False
+    query_cache_size: int = 1024
+    query_disk_cache: bool = True
+
+
 class RetrievalConfig(BaseModel):
     top_k: int = 5
+    hybrid: bool = True
+    candidates: int = 20
+    broad_files: int = 15
+    context_token_budget: int = 3000
+    lexical_max_postings: int = 0
     include_metadata_in_context: bool = True
 
 
 class LLMConfig(BaseModel):
     model: str = "claude-sonnet-4-20250514"
     max_tokens: int = 1024
+    stream: bool = True
+    quiz_max_turns: int = 0
+    max_retries: int = 6
+    batch_concurrency: int = 8
+
+
+class CacheConfig(BaseModel):
+    embedding_max_mb: int = 512
+    answer_ttl_hours: float = 168
+    answer_max_mb: int = 64
+
+
+class DaemonConfig(BaseModel):
+    socket_path: Path = Path("./data/nsie.sock")
 
 
 class Config(BaseModel):
     paths: PathsConfig
     chunking: ChunkingConfig = ChunkingConfig()
+    ingest: IngestConfig = IngestConfig()
+    embedding: EmbeddingConfig = EmbeddingConfig()
     retrieval: RetrievalConfig = RetrievalConfig()
     llm: LLMConfig = LLMConfig()
+    cache: CacheConfig = CacheConfig()
+    daemon: DaemonConfig = DaemonConfig()
 
 
 def load_config(config_path: Path = Path("config.yaml")) -> Config:
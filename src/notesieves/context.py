@@ -0,0 +1,80 @@
+from collections.abc import Callable
+
+
+def _merge_texts(first: str, second: str) -> str:
+    """Join two consecutive chunks of one section, dropping their overlap.
+
+    The chunker repeats whole trailing paragraphs of a chunk at the start of
+    the next one, so the overlap is the longest run of paragraphs that ends
+    `first` and starts `second`.
+    """
+    head = first.split("\n\n")
+    tail = second.split("\n\n")
+    for size in range(min(len(head), len(tail)), 0, -1):
+        if head[-size:] == tail[:size]:
+            return "\n\n".join(head + tail[size:])
+    return f"{first}\n\n{second}"
+
+
+def _passages(chunks: list[dict]) -> list[dict]:
+    """Merge retrieved chunks that are neighbours in the same section.
+
+    Each passage keeps the metadata of its first chunk and the retrieval
+    rank of its best chunk.
+    """
+    groups: dict[tuple[str, str], list[tuple[int, dict]]] = {}
+    for rank, chunk in enumerate(chunks):
+        meta = chunk["metadata"]
+        groups.setdefault((meta.get("file_path", ""), meta.get("heading_hierarchy", "")), []).append((rank, chunk))
+
+    passages = []
+    for members in groups.values():
+        members.sort(key=lambda m: m[1]["metadata"].get("chunk_index", 0))
+        current = None
+        for rank, chunk in members:
+            index = chunk["metadata"].get("chunk_index", 0)
+            if current is not None and index == current["last_index"] + 1:
+                current["text"] = _merge_texts(current["text"], chunk["text"])
+                current["rank"] = min(current["rank"], rank)
+                current["last_index"] = index
+                continue
+            current = {"text": chunk["text"], "metadata": chunk["metadata"], "rank": rank, "last_index": index}
+            passages.append(current)
+
+    passages.sort(key=lambda p: p["rank"])
+    return [{"text": p["text"], "metadata": p["metadata"]} for p in passages]
+
+
+def pack_context(
+    chunks: list[dict],
+    count_tokens: Callable[[list[str]], list[int]],
+    budget: int,
+) -> tuple[list[dict], dict]:
+    """Assemble retrieved chunks into the context sent to the LLM.
+
+    Neighbouring chunks of one section are merged with their overlap
+    removed, the resulting passages keep the retriever's ranking, and they
+    are added best first while they fit in `budget` tokens (0 = no limit).
+    The best passage is always kept. Returns the passages and a stats dict
+    with token counts before and after.
+    """
+    passages = _passages(chunks)
+    counts = count_tokens([c["text"] for c in chunks] + [p["text"] for p in passages])
+    chunk_tokens, passage_tokens = counts[:len(chunks)], counts[len(chunks):]
+
+    packed = []
+    used = 0
+    for passage, tokens in zip(passages, passage_tokens):
+        if budget and packed and used + tokens > budget:
+            continue
+        packed.append(passage)
+        used += tokens
+
+    tokens_before = sum(chunk_tokens)
+    return packed, {
+        "chunks": len(chunks),
+        "passages": len(packed),
+        "tokens_before": tokens_before,
+        "tokens_after": used,
+        "tokens_saved": tokens_before - used,
+    }
@@ -0,0 +1,313 @@
+"""Resident `nsie serve` daemon.
+
+The daemon holds the embedding model, the Chroma client and the Anthropic
+client in one long-running process and exposes their public methods over a
+local Unix socket. CLI commands call `connect()` first and only build the
+services in-process when no compatible daemon is listening.
+
+Wire format: one JSON object per line in each direction. A request is
+``{"target": ..., "method": ..., "args": [...], "kwargs": {...}}`` and the
+reply is either ``{"result": ...}`` or ``{"error": ..., "type": ...}``.
+Methods that return a generator (streamed LLM output) reply with one
+``{"item": ...}`` line per value followed by ``{"end": true}``.
+"""
+import inspect
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rich.console import Console
+
+from .chunker import Chunk
+from .trace import span
+
+if TYPE_CHECKING:
+    from .config import Config
+
+console = Console()
+
+PROTOCOL_VERSION = 2
+
+
+class DaemonError(Exception):
+    """An exception raised inside the daemon while serving a request."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+        self.message = message
+
+
+def _fingerprint(config: "Config") -> dict:
+    """Settings that must match for a client to reuse the daemon's services."""
+    return {
+        "database_directory": str(config.paths.database_directory.expanduser().resolve()),
+        "embedding_model": config.embedding.model,
+        "embedding_backend": config.embedding.backend,
+        "embedding_quantize": config.embedding.quantize,
+        "llm_model": config.llm.model,
+        "llm_max_tokens": config.llm.max_tokens,
+    }
+
+
+def _encode(obj):
+    if isinstance(obj, Chunk):
+        return {"__chunk__": {"text": obj.text, "metadata": obj.metadata, "id": obj.id}}
+    if isinstance(obj, Path):
+        return str(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Cannot send {type(obj).__name__} to the daemon")
+
+
+def _decode(obj: dict):
+    if "__chunk__" in obj:
+        return Chunk(**obj["__chunk__"])
+    return obj
+
+
+def _send(wfile, message: dict):
+    wfile.write(json.dumps(message, default=_encode).encode("utf-8") + b"\n")
+    wfile.flush()
+
+
+def _recv(rfile) -> dict | None:
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line, object_hook=_decode)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            request = _recv(self.rfile)
+            if request is None:
+                return
+            try:
+                result = self.server.dispatch(request)
+                if inspect.isgenerator(result):
+                    for item in result:
+                        _send(self.wfile, {"item": item})
+                    _send(self.wfile, {"end": True})
+                    continue
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                _send(self.wfile, {"error": str(e), "type": type(e).__name__})
+            else:
+                _send(self.wfile, {"result": result})
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, config: "Config", services: dict):
+        self.config = config
+        self.services = services
+        # The embedding model and the Chroma client are shared by every
+        # connection; LLM calls are independent and may run concurrently.
+        self.locks = {"embedder": threading.Lock(), "store": threading.Lock()}
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def info(self) -> dict:
+        return {
+            "protocol": PROTOCOL_VERSION,
+            "pid": os.getpid(),
+            "fingerprint": _fingerprint(self.config),
+        }
+
+    def dispatch(self, request: dict):
+        target = request["target"]
+        method_name = request["method"]
+        args = request.get("args", [])
+        kwargs = request.get("kwargs", {})
+
+        if target == "daemon" and method_name == "info":
+            return self.info()
+
+        service = self.services.get(target)
+        method = getattr(service, method_name, None) if service is not None else None
+        if method_name.startswith("_") or not callable(method):
+            raise AttributeError(f"Unknown daemon method {target}.{method_name}")
+        if inspect.iscoroutinefunction(method):
+            raise AttributeError(f"{target}.{method_name} is async and only available in-process")
+
+        lock = self.locks.get(target)
+        if lock is None:
+            return method(*args, **kwargs)
+        with lock:
+            return method(*args, **kwargs)
+
+
+class RemoteService:
+    """Proxy that forwards public method calls to a service in the daemon."""
+
+    def __init__(self, client: "DaemonClient", target: str):
+        self._client = client
+        self._target = target
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self._client.call(self._target, name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+
+class DaemonClient:
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._rfile = sock.makefile("rb")
+        self._wfile = sock.makefile("wb")
+        self._lock = threading.Lock()
+        self._closed = False
+        self.info: dict = {}
+        self.embedder = RemoteService(self, "embedder")
+        self.store = RemoteService(self, "store")
+        self.llm = RemoteService(self, "llm")
+
+    def call(self, target: str, method: str, *args, **kwargs):
+        """Invoke `target.method(*args, **kwargs)` inside the daemon.
+
+        Streaming methods return a generator; the connection stays reserved
+        for it until it is exhausted or closed.
+        """
+        request = {"target": target, "method": method, "args": list(args), "kwargs": kwargs}
+        self._lock.acquire()
+        if self._closed:
+            self._lock.release()
+            raise DaemonError("ConnectionError", "connection to the daemon was closed (an earlier reply was cut short)")
+        try:
+            # Spans inside the daemon are not collected; this is the round trip.
+            with span(f"daemon.{target}.{method}"):
+                _send(self._wfile, request)
+                response = self._read()
+        except BaseException:
+            self._lock.release()
+            raise
+
+        if "item" in response or "end" in response:
+            return self._stream(response)
+        self._lock.release()
+        if "error" in response:
+            raise DaemonError(response["type"], response["error"])
+        return response["result"]
+
+    def _read(self) -> dict:
+        response = _recv(self._rfile)
+        if response is None:
+            raise DaemonError("ConnectionError", "daemon closed the connection")
+        return response
+
+    def _stream(self, response: dict):
+        try:
+            while "item" in response:
+                yield response["item"]
+                response = self._read()
+            if "error" in response:
+                raise DaemonError(response["type"], response["error"])
+        finally:
+            if "end" not in response and "error" not in response:
+                # Abandoned mid-stream: the remaining lines would be read as
+                # replies to the next call, so this connection is done.
+                self.close()
+            self._lock.release()
+
+    def close(self):
+        self._closed = True
+        self._rfile.close()
+        self._wfile.close()
+        self._sock.close()
+
+
+def _open_socket(socket_path: Path) -> socket.socket | None:
+    if not socket_path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def connect(config: "Config") -> DaemonClient | None:
+    """Connect to a running daemon, or return None if there is no compatible one."""
+    sock = _open_socket(config.daemon.socket_path)
+    if sock is None:
+        return None
+
+    client = DaemonClient(sock)
+    try:
+        client.info = client.call("daemon", "info")
+    except (OSError, ValueError, DaemonError):
+        client.close()
+        return None
+
+    if (
+        client.info.get("protocol") != PROTOCOL_VERSION
+        or client.info.get("fingerprint") != _fingerprint(config)
+    ):
+        client.close()
+        return None
+    return client
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_serve(config: "Config"):
+    """Load all services once and serve them until interrupted."""
+    socket_path = config.daemon.socket_path
+
+    live = _open_socket(socket_path)
+    if live is not None:
+        live.close()
+        console.print(f"[yellow]A daemon is already listening on {socket_path}.[/yellow]")
+        return
+    socket_path.unlink(missing_ok=True)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with console.status("Loading embedding model..."):
+        from .embeddings import EmbeddingService
+        embedder = EmbeddingService.from_config(config)
+
+    from .llm import LLMService
+    from .vectorstore import VectorStore
+
+    services = {
+        "embedder": embedder,
+        "store": VectorStore(config.paths.database_directory),
+        "llm": LLMService.from_config(config),
+    }
+
+    server = DaemonServer(socket_path, config, services)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    console.print(f"[green]Listening[/green] on {socket_path} (pid {os.getpid()})")
+    console.print("[dim]Press Ctrl+C to stop.[/dim]")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+    console.print("\n[dim]Daemon stopped.[/dim]")
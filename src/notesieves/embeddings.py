@@ -1,19 +1,313 @@
+import atexit
+import json
 import logging
+from collections import OrderedDict
+from pathlib import Path
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from .trace import traced
 
 # Suppress the harmless "position_ids UNEXPECTED" warning from transformers
 logging.getLogger("transformers.modeling_utils").setLevel(logging.ERROR)
 
+BACKENDS = ("torch", "onnx")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate: ~4 chars per token for English."""
+    return len(text) // 4
+
+
+class TorchBackend:
+    """sentence-transformers on PyTorch."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
 
-class EmbeddingService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         self.model = SentenceTransformer(model_name)
+        self.on_cpu = self.model.device.type == "cpu"
+
+    def encode(self, texts: list[str], batch_size: int, show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar)
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        encoded = self.model.tokenizer(texts, add_special_tokens=False, truncation=False, verbose=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+
+class OnnxBackend:
+    """ONNX Runtime inference with mean pooling, no torch import.
+
+    Loads `onnx/model.onnx` and `tokenizer.json` from a local model directory
+    or from the model's Hugging Face repo. With `quantize`, the model is
+    dynamically quantized to int8 once and cached under `cache_dir`.
+    """
+
+    on_cpu = True
+
+    def __init__(self, model_name: str, quantize: bool = False, cache_dir: Path = Path("./data/cache")):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = self._resolve(model_name, "onnx/model.onnx")
+        if quantize:
+            model_path = self._quantize(model_name, model_path, cache_dir)
+
+        self.session = onnxruntime.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        settings = self._read_json(model_name, "sentence_bert_config.json")
+        modules = self._read_json(model_name, "modules.json") or []
+        self.normalize = not modules or any(m.get("type", "").endswith("Normalize") for m in modules)
+
+        tokenizer_path = str(self._resolve(model_name, "tokenizer.json"))
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=(settings or {}).get("max_seq_length", 512))
+        self.tokenizer.enable_padding()
+        # Counting needs the full length, so it gets an untruncated copy.
+        self.counter = Tokenizer.from_file(tokenizer_path)
+        self.counter.no_truncation()
+        self.counter.no_padding()
+
+    @staticmethod
+    def _resolve(model_name: str, filename: str) -> Path:
+        local = Path(model_name).expanduser()
+        if local.is_dir():
+            return local / filename
+
+        from huggingface_hub import hf_hub_download
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        return Path(hf_hub_download(repo_id, filename))
+
+    def _read_json(self, model_name: str, filename: str):
+        try:
+            return json.loads(self._resolve(model_name, filename).read_text())
+        except Exception:
+            return None
+
+    @staticmethod
+    def _quantize(model_name: str, model_path: Path, cache_dir: Path) -> Path:
+        quantized = cache_dir / "onnx" / f"{Path(model_name).name}-int8.onnx"
+        if not quantized.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantized.parent.mkdir(parents=True, exist_ok=True)
+            quantize_dynamic(str(model_path), str(quantized), weight_type=QuantType.QInt8)
+        return quantized
+
+    def encode(self, texts: list[str], batch_size: int, show_progress_bar: bool = False) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+            # Mean pooling over real (non-padding) tokens
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.append(pooled)
+        return np.concatenate(vectors)
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [len(e.ids) for e in self.counter.encode_batch(texts, add_special_tokens=False)]
+
+
+def load_backend(name: str, model_name: str, quantize: bool = False, cache_dir: Path = Path("./data/cache")):
+    """Instantiate an embedding backend by its config name."""
+    if name == "torch":
+        return TorchBackend(model_name)
+    if name == "onnx":
+        return OnnxBackend(model_name, quantize=quantize, cache_dir=cache_dir)
+    raise ValueError(f"Unknown embedding backend {name!r} (expected one of {', '.join(BACKENDS)})")
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        processes: int = 0,
+        backend: str = "torch",
+        quantize: bool = False,
+        cache_dir: Path = Path("./data/cache"),
+        query_cache_size: int = 1024,
+        query_disk_cache=None,
+    ):
+        self.backend = load_backend(backend, model_name, quantize=quantize, cache_dir=cache_dir)
+        self.batch_size = batch_size
+        self.processes = processes
+        self._pool = None
+        self.query_cache_size = query_cache_size
+        self.query_disk_cache = query_disk_cache
+        self._query_cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._query_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @classmethod
+    def from_config(cls, config) -> "EmbeddingService":
+        """Build the service described by the `embedding` config section."""
+        query_disk_cache = None
+        if config.embedding.query_disk_cache:
+            from .cache import EmbeddingCache
+
+            query_disk_cache = EmbeddingCache.from_config(config)
+        return cls(
+            model_name=config.embedding.model,
+            batch_size=config.embedding.batch_size,
+            processes=config.embedding.processes,
+            backend=config.embedding.backend,
+            quantize=config.embedding.quantize,
+            cache_dir=config.paths.cache_directory,
+            query_cache_size=config.embedding.query_cache_size,
+            query_disk_cache=query_disk_cache,
+        )
 
     def embed_text(self, text: str) -> list[float]:
         """Embed a single text."""
-        return self.model.encode(text).tolist()
+        return self.backend.encode([text], batch_size=1)[0].tolist()
+
+    @traced("embed.count_tokens")
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        """Token count of each text under the embedding model's tokenizer."""
+        if not texts:
+            return []
+        return self.backend.count_tokens(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a question, reusing cached vectors for repeated ones."""
+        return self.embed_queries([text])[0]
+
+    @traced("embed.queries")
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many questions, encoding all cache misses in one pass.
+
+        Looks each text up in the in-process LRU, then in the on-disk
+        embedding cache (when configured), and encodes the rest together.
+        """
+        vectors: list[list[float] | None] = [None] * len(texts)
+        stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        missing: dict[str, list[int]] = {}
+        for i, text in enumerate(texts):
+            if text in self._query_cache:
+                self._query_cache.move_to_end(text)
+                vectors[i] = self._query_cache[text]
+                stats["memory_hits"] += 1
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing and self.query_disk_cache is not None:
+            for text, vector in zip(list(missing), self.query_disk_cache.get_many(list(missing))):
+                if vector is not None:
+                    self._remember(text, vector)
+                    for i in missing.pop(text):
+                        vectors[i] = vector
+                        stats["disk_hits"] += 1
+
+        if missing:
+            fresh = self.backend.encode(list(missing), batch_size=self.batch_size)
+            fresh = [v.tolist() for v in fresh]
+            for text, vector in zip(missing, fresh):
+                self._remember(text, vector)
+                for i in missing[text]:
+                    vectors[i] = vector
+                    stats["misses"] += 1
+            if self.query_disk_cache is not None:
+                self.query_disk_cache.put_many(list(missing), fresh)
+
+        for name, n in stats.items():
+            self._query_stats[name] += n
+        if self.query_disk_cache is not None:
+            self.query_disk_cache.bump({f"query_{name}": n for name, n in stats.items()})
+        return vectors
+
+    def _remember(self, text: str, vector: list[float]):
+        if self.query_cache_size <= 0:
+            return
+        self._query_cache[text] = vector
+        self._query_cache.move_to_end(text)
+        while len(self._query_cache) > self.query_cache_size:
+            self._query_cache.popitem(last=False)
+
+    def query_cache_stats(self) -> dict:
+        """Query cache hits and misses since this service started."""
+        return {**self._query_stats, "memory_entries": len(self._query_cache)}
+
+    @traced("embed.batch")
+    def embed_batch(self, texts: list[str], show_progress_bar: bool = True) -> list[list[float]]:
+        """Embed multiple texts efficiently.
+
+        Texts are sorted by estimated token length so each batch holds
+        similarly sized inputs and carries little padding; the result is
+        returned in the original order.
+        """
+        if not texts:
+            return []
+
+        order = sorted(range(len(texts)), key=lambda i: _estimate_tokens(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+
+        pool = self._get_pool() if len(texts) >= 2 * self.batch_size else None
+        if pool is not None:
+            vectors = self.backend.model.encode_multi_process(sorted_texts, pool, batch_size=self.batch_size)
+        else:
+            vectors = self.backend.encode(sorted_texts, self.batch_size, show_progress_bar=show_progress_bar)
+
+        embeddings: list[list[float]] = [[] for _ in texts]
+        for position, index in enumerate(order):
+            embeddings[index] = vectors[position].tolist()
+        return embeddings
+
+    def _get_pool(self):
+        """Start the multi-process encode pool on first use (torch on CPU only)."""
+        if (
+            self._pool is None
+            and self.processes > 1
+            and isinstance(self.backend, TorchBackend)
+            and self.backend.on_cpu
+        ):
+            self._pool = self.backend.model.start_multi_process_pool(["cpu"] * self.processes)
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self):
+        """Stop the multi-process encode pool, if one was started."""
+        if self._pool is not None:
+            self.backend.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+
+def check_parity(
+    model_name: str,
+    texts: list[str],
+    backends: tuple[str, str] = ("torch", "onnx"),
+    quantize: bool = False,
+    cache_dir: Path = Path("./data/cache"),
+) -> dict:
+    """Compare two backends on the same texts.
+
+    Returns the smallest per-text cosine similarity between the backends'
+    vectors and the largest difference between their pairwise text-to-text
+    cosine similarity matrices (the quantity retrieval ranking depends on).
+    """
+    matrices = []
+    for name in backends:
+        vectors = load_backend(name, model_name, quantize=quantize and name == "onnx", cache_dir=cache_dir).encode(
+            texts, batch_size=32
+        )
+        vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        matrices.append(vectors)
 
-    def embed_batch(self, texts: list[str]) -> list[list[float]]:
-        """Embed multiple texts efficiently."""
-        return self.model.encode(texts, show_progress_bar=True).tolist()
+    a, b = matrices
+    return {
+        "min_vector_cosine": float((a * b).sum(axis=1).min()),
+        "max_similarity_delta": float(np.abs(a @ a.T - b @ b.T).max()),
+    }
@@ -1,12 +1,18 @@
 import hashlib
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
 from pathlib import Path
 
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
+from .cache import EmbeddingCache
 from .chunker import MarkdownChunker
 from .config import Config
-from .vectorstore import VectorStore
+from .daemon import connect
+from .manifest import Manifest
+from .scanner import VaultScanner
+from .trace import span, traced
 
 console = Console()
 
@@ -16,41 +22,227 @@ def _hash_file(file_path: Path) -> str:
     return hashlib.sha256(file_path.read_bytes()).hexdigest()[:16]
 
 
-def run_ingest(config: Config, notes_path: Path, clear: bool = False):
-    """Run the full ingestion pipeline."""
+def _hash_files(
+    md_files: list[Path],
+    manifest: Manifest,
+    verify: bool = False,
+    pool: Executor | None = None,
+) -> tuple[dict[str, str], int]:
+    """Hash files whose stat tuple changed since the last run.
+
+    Returns the path → hash map for all files and how many were re-hashed.
+    With `verify`, every file is hashed regardless of the manifest.
+    """
+    disk_files = {}
+    to_hash = []
+    for file_path in md_files:
+        fp = str(file_path)
+        stat = file_path.stat()
+        file_hash = None if verify else manifest.lookup(fp, stat)
+        if file_hash is None:
+            to_hash.append((file_path, stat))
+        disk_files[fp] = file_hash
+
+    paths = [file_path for file_path, _ in to_hash]
+    hashes = pool.map(_hash_file, paths, chunksize=32) if pool else map(_hash_file, paths)
+    for (file_path, stat), file_hash in zip(to_hash, hashes):
+        manifest.record(str(file_path), stat, file_hash)
+        disk_files[str(file_path)] = file_hash
+
+    return disk_files, len(to_hash)
+
+
+def _chunk_file(chunker: MarkdownChunker, file_path: Path, file_hash: str):
+    # Only timed when run in this process, i.e. without worker processes.
+    with span("ingest.chunk"):
+        return str(file_path), chunker.chunk_file(file_path, file_hash=file_hash)
+
+
+def _iter_chunked_files(
+    chunker: MarkdownChunker,
+    files: list[Path],
+    disk_files: dict[str, str],
+    pool: Executor | None = None,
+    window: int = 1,
+):
+    """Yield (file path, chunks) for each file.
+
+    With a pool, files are chunked concurrently and yielded in order of
+    completion, with at most `window` files in flight. Chunk contents and
+    metadata depend only on the file itself, so the order doesn't affect them.
+    """
+    if pool is None:
+        for file_path in files:
+            yield _chunk_file(chunker, file_path, disk_files[str(file_path)])
+        return
+
+    remaining = iter(files)
+    pending = set()
+    for file_path in remaining:
+        pending.add(pool.submit(_chunk_file, chunker, file_path, disk_files[str(file_path)]))
+        if len(pending) >= window:
+            break
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+            file_path = next(remaining, None)
+            if file_path is not None:
+                pending.add(pool.submit(_chunk_file, chunker, file_path, disk_files[str(file_path)]))
+
+
+def _iter_file_batches(chunked_files, batch_size: int):
+    """Yield lists of (file path, chunks) holding ~batch_size chunks in total.
+
+    Files are never split across groups, so each group can be committed to the
+    store on its own and a crash never leaves a file half-indexed.
+    """
+    batch = []
+    batch_chunks = 0
+    for fp, chunks in chunked_files:
+        batch.append((fp, chunks))
+        batch_chunks += len(chunks)
+        if batch_chunks >= batch_size:
+            yield batch
+            batch, batch_chunks = [], 0
+
+    if batch:
+        yield batch
+
+
+@traced("ingest.embed")
+def _embed_with_cache(embedder, cache: EmbeddingCache, texts: list[str], batch_size: int) -> tuple[list, int]:
+    """Embed texts, reusing cached vectors; returns (embeddings, cache hits)."""
+    embeddings = cache.get_many(texts)
+    missing = [i for i, vector in enumerate(embeddings) if vector is None]
+
+    missing_texts = [texts[i] for i in missing]
+    fresh = []
+    for start in range(0, len(missing_texts), batch_size):
+        fresh.extend(embedder.embed_batch(missing_texts[start:start + batch_size], show_progress_bar=False))
+    cache.put_many(missing_texts, fresh)
+
+    for i, vector in zip(missing, fresh):
+        embeddings[i] = vector
+    return embeddings, len(texts) - len(missing)
+
+
+def run_ingest(
+    config: Config,
+    notes_path: Path,
+    clear: bool = False,
+    verify: bool = False,
+    workers: int | None = None,
+    services: tuple | None = None,
+    paths: set[Path] | None = None,
+    quiet: bool = False,
+    manifest: Manifest | None = None,
+    stored_hashes: dict[str, str] | None = None,
+) -> dict:
+    """Run the full ingestion pipeline.
+
+    `services` is an already loaded (embedder, store) pair. With `paths`,
+    only those files are brought up to date (indexed, re-indexed or
+    removed, depending on what is on disk) and the vault is not scanned.
+    `quiet` suppresses all output. A caller running many ingests can pass
+    its own `manifest` (which is then not saved) and `stored_hashes` (the
+    store's `get_file_hashes()`, kept up to date in place) instead of
+    having them loaded each time. Returns counts of what was done.
+    """
+    workers = workers or config.ingest.workers
+    # Spawned (not forked) workers: the parent may already hold torch threads.
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers > 1
+        else None
+    )
+    try:
+        return _run_ingest(
+            config, notes_path, clear, verify, pool, workers * 4, services, paths,
+            Console(quiet=True) if quiet else console, manifest, stored_hashes,
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _run_ingest(
+    config: Config,
+    notes_path: Path,
+    clear: bool,
+    verify: bool,
+    pool: Executor | None,
+    window: int,
+    services: tuple | None,
+    paths: set[Path] | None,
+    console: Console,
+    manifest: Manifest | None,
+    stored_hashes: dict[str, str] | None,
+) -> dict:
+    """Body of `run_ingest`, with the worker pool (if any) already set up."""
     chunker = MarkdownChunker(
         max_tokens=config.chunking.max_chunk_tokens,
         overlap_tokens=config.chunking.overlap_tokens,
     )
+    stats = {"files": 0, "chunks": 0, "added": 0, "removed": 0, "deleted": 0}
 
-    with console.status("Loading embedding model..."):
-        from .embeddings import EmbeddingService
-        embedder = EmbeddingService()
+    if services is not None:
+        embedder, store = services
+    elif (client := connect(config)) is not None:
+        embedder, store = client.embedder, client.store
+    else:
+        with console.status("Loading embedding model..."), span("load.embedding_model"):
+            from .embeddings import EmbeddingService
+            embedder = EmbeddingService.from_config(config)
 
-    store = VectorStore(config.paths.database_directory)
+        with span("load.store"):
+            from .vectorstore import VectorStore
+            store = VectorStore(config.paths.database_directory)
 
     if clear:
         console.print("[yellow]Clearing existing index...[/yellow]")
         store.clear()
 
-    md_files = list(notes_path.rglob("*.md"))
-    if not md_files:
-        console.print("[red]No markdown files found.[/red]")
-        return
+    if paths is None:
+        with span("ingest.scan"):
+            scan = VaultScanner.from_config(config, notes_path).scan()
+        md_files = scan.files
+        if not md_files:
+            console.print("[red]No markdown files found.[/red]")
+            return stats
 
-    console.print(f"Found [green]{len(md_files)}[/green] markdown files")
+        console.print(f"Found [green]{len(md_files)}[/green] markdown files")
+        console.print(
+            f"  [dim]Scanned {scan.scanned_dirs} folders in {scan.seconds * 1000:.0f} ms; "
+            f"ignored {scan.ignored_files} files and {scan.pruned_dirs} folders[/dim]"
+        )
+    else:
+        md_files = sorted(p for p in paths if p.is_file())
 
-    # Compute hashes for all files on disk
-    disk_files = {}
-    for file_path in md_files:
-        disk_files[str(file_path)] = _hash_file(file_path)
+    # Compute hashes for files whose size/mtime/inode changed since last run
+    with span("ingest.hash", files=len(md_files)) as hashing:
+        own_manifest = manifest is None
+        if own_manifest:
+            manifest = Manifest(config.paths.database_directory / "ingest_manifest.json")
+        disk_files, rehashed = _hash_files(md_files, manifest, verify=verify, pool=pool)
+        if paths is None:
+            manifest.prune(set(disk_files))
+        if own_manifest:
+            manifest.save()
+        hashing.set(rehashed=rehashed)
+    if rehashed:
+        console.print(f"  [dim]Hashed: {rehashed} files[/dim]")
 
     # Get stored hashes from the database
-    stored_hashes = store.get_file_hashes()
+    if stored_hashes is None:
+        stored_hashes = store.get_file_hashes()
 
     # Determine what changed
     disk_paths = set(disk_files.keys())
     stored_paths = set(stored_hashes.keys())
+    if paths is not None:
+        stored_paths &= {str(p) for p in paths}
 
     new_files = disk_paths - stored_paths
     deleted_files = stored_paths - disk_paths
@@ -70,20 +262,27 @@ def run_ingest(config: Config, notes_path: Path, clear: bool = False):
     if deleted_files:
         console.print(f"  [red]Deleted: {len(deleted_files)} files[/red]")
 
-    # Delete chunks for changed and deleted files
-    files_to_delete = changed_files | deleted_files
-    if files_to_delete:
+    # Files that disappeared from disk can go right away; changed files are
+    # replaced batch by batch below so an interrupted run can resume.
+    if deleted_files:
         with console.status("Removing outdated chunks..."):
-            for fp in files_to_delete:
-                store.delete_by_file(fp)
+            store.delete_files(sorted(deleted_files))
+        for fp in deleted_files:
+            del stored_hashes[fp]
+    stats["deleted"] = len(deleted_files)
 
     if not files_to_process:
         console.print("[green]Everything up to date.[/green]")
-        return
+        return stats
 
-    # Chunk new and changed files
-    all_chunks = []
+    # Stream new and changed files through chunk → embed → store
+    batch_size = config.ingest.batch_size
     files_list = [Path(fp) for fp in sorted(files_to_process)]
+    total_chunks = 0
+    embedded = 0
+    removed = 0
+    cache_hits = 0
+    cache = EmbeddingCache.from_config(config)
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -91,33 +290,62 @@ def run_ingest(config: Config, notes_path: Path, clear: bool = False):
         TaskProgressColumn(),
         console=console,
     ) as progress:
-        task = progress.add_task("Chunking files...", total=len(files_list))
-        for file_path in files_list:
-            file_hash = disk_files[str(file_path)]
-            chunks = chunker.chunk_file(file_path, file_hash=file_hash)
-            all_chunks.extend(chunks)
-            progress.advance(task)
+        task = progress.add_task("Indexing files...", total=len(files_list))
+        chunked_files = _iter_chunked_files(chunker, files_list, disk_files, pool=pool, window=window)
+        for batch in _iter_file_batches(chunked_files, batch_size):
+            # Diff each file's new chunk set against what is stored, so only
+            # added chunks are embedded and only stale ones are deleted.
+            stored = store.get_ids_by_files([fp for fp, _ in batch if fp in changed_files])
+            diffs = []
+            to_embed = []
+            for fp, chunks in batch:
+                stored_ids = set(stored.get(fp, ()))
+                added = [c for c in chunks if c.id not in stored_ids]
+                kept = [c for c in chunks if c.id in stored_ids]
+                stale_ids = sorted(stored_ids - {c.id for c in chunks})
+                diffs.append((fp, added, kept, stale_ids))
+                to_embed.extend(added)
+                total_chunks += len(chunks)
+                removed += len(stale_ids)
 
-    console.print(f"Created [green]{len(all_chunks)}[/green] chunks")
+            embeddings, hits = _embed_with_cache(embedder, cache, [c.text for c in to_embed], batch_size)
+            cache_hits += hits
+            embedded += len(to_embed)
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Generating embeddings...", total=len(all_chunks))
-        texts = [chunk.text for chunk in all_chunks]
-        embeddings = embedder.embed_batch(texts)
-        progress.update(task, completed=len(all_chunks))
+            updates = []
+            offset = 0
+            for fp, added, kept, stale_ids in diffs:
+                mtime = Path(fp).stat().st_mtime
+                for c in added + kept:
+                    c.metadata["mtime"] = mtime  # lets `--since` filter inside Chroma
+                updates.append({
+                    "path": fp,
+                    "hash": disk_files[fp],
+                    "mtime": mtime,
+                    "added": added,
+                    "embeddings": embeddings[offset:offset + len(added)],
+                    "kept": kept,
+                    "removed_ids": stale_ids,
+                })
+                offset += len(added)
+            store.replace_files(updates)
+            stored_hashes.update((fp, disk_files[fp]) for fp, _ in batch)
 
-    with console.status("Storing in vector database..."):
-        store.add_chunks(all_chunks, embeddings)
+            progress.advance(task, len(batch))
 
     console.print(
         f"[green]Done.[/green] Processed {len(files_to_process)} files "
-        f"({len(all_chunks)} chunks)"
+        f"({total_chunks} chunks: {embedded} added, {removed} removed, "
+        f"{total_chunks - embedded} unchanged)"
     )
+    if embedded:
+        console.print(
+            f"  [dim]Embedding cache: {cache_hits}/{embedded} hits "
+            f"({cache_hits / embedded:.0%})[/dim]"
+        )
+    cache.evict()
+    cache.close()
     if deleted_files:
         console.print(f"  Removed {len(deleted_files)} deleted files from index")
+    stats.update(files=len(files_to_process), chunks=total_chunks, added=embedded, removed=removed)
+    return stats
@@ -0,0 +1,142 @@
+import re
+import sqlite3
+from pathlib import Path
+
+# Identifiers like ERR_CONN_RESET or snake_case names stay one token.
+_TOKEN_RE = re.compile(r"\w+")
+
+# Automatic postings cap: this share of the indexed chunks, with a floor so
+# small vaults read every posting list and a ceiling so per-query work stays
+# bounded however large the index grows.
+_AUTO_POSTINGS_FRACTION = 0.10
+_MIN_AUTO_POSTINGS = 5_000
+_MAX_AUTO_POSTINGS = 20_000
+
+
+def lexical_path(persist_directory: Path, collection_name: str = "notes") -> Path:
+    """Location of the lexical index for a collection in a Chroma directory."""
+    return persist_directory / f"{collection_name}.lexical.sqlite3"
+
+
+def query_terms(query: str) -> list[str]:
+    """Unique lowercase terms of free text, in order of appearance."""
+    return list(dict.fromkeys(t.lower() for t in _TOKEN_RE.findall(query)))
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk text, kept next to the Chroma collection.
+
+    Chunk rows (id, file path, text) live in a plain table indexed by file,
+    and an external-content FTS5 table over them is kept in sync by
+    triggers, so adds and deletes by chunk ID or by file are incremental.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                file_path TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_file_path ON chunks (file_path);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, content='chunks', content_rowid='rowid', tokenize="unicode61 tokenchars '_'"
+            );
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts (rowid, text) VALUES (new.rowid, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+            END;
+            """
+        )
+        self.conn.commit()
+        self._count: int | None = None
+
+    def add(self, chunks: list):
+        """Index chunks, replacing any already stored under the same ID."""
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(c.id,) for c in chunks])
+        self.conn.executemany(
+            "INSERT INTO chunks (id, file_path, text) VALUES (?, ?, ?)",
+            [(c.id, c.metadata["file_path"], c.text) for c in chunks],
+        )
+        self.conn.commit()
+        self._count = None
+
+    def delete_ids(self, ids: list[str]):
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+        self.conn.commit()
+        self._count = None
+
+    def delete_files(self, file_paths: list[str]):
+        self.conn.executemany("DELETE FROM chunks WHERE file_path = ?", [(p,) for p in file_paths])
+        self.conn.commit()
+        self._count = None
+
+    def clear(self):
+        self.conn.execute("DELETE FROM chunks")
+        self.conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('delete-all')")
+        self.conn.commit()
+        self._count = 0
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return self._count
+
+    def search(self, query: str, top_k: int = 20, max_postings: int = 0) -> list[str]:
+        """Return the IDs of the best BM25 matches for `query`, best first.
+
+        Query cost grows with the number of chunks containing its terms, so
+        terms are taken rarest first while their combined document count
+        stays within `max_postings` (0 = 10% of the indexed chunks, between
+        5000 and 20000, so per-query work is bounded at any vault size).
+        Words in more chunks than that carry little BM25 weight anyway; a
+        query made only of them returns nothing and is left to dense search.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        if max_postings <= 0:
+            max_postings = min(
+                max(_MIN_AUTO_POSTINGS, int(self.count() * _AUTO_POSTINGS_FRACTION)), _MAX_AUTO_POSTINGS
+            )
+
+        doc_counts = {term: self._doc_count(term, max_postings) for term in terms}
+        selected = []
+        postings = 0
+        for term in sorted(terms, key=doc_counts.get):
+            postings += doc_counts[term]
+            if postings > max_postings:
+                break
+            selected.append(term)
+        if not selected:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT chunks.id FROM chunks_fts JOIN chunks ON chunks.rowid = chunks_fts.rowid"
+            " WHERE chunks_fts MATCH ? ORDER BY chunks_fts.rank LIMIT ?",
+            (" OR ".join(f'"{t}"' for t in selected), top_k),
+        )
+        return [chunk_id for (chunk_id,) in rows]
+
+    def _doc_count(self, term: str, limit: int) -> int:
+        """Number of chunks containing `term`, counting no further than limit + 1."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? LIMIT ?)",
+            (f'"{term}"', limit + 1),
+        ).fetchone()[0]
+
+    def optimize(self):
+        """Merge the index's b-tree segments (smaller and faster after bulk loads)."""
+        self.conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
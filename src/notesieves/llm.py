@@ -1,33 +1,99 @@
+from collections.abc import Iterator
+
 import anthropic
 from dotenv import load_dotenv
 
+from .trace import span, traced
+
 load_dotenv()
 
 
+def _usage(message) -> dict:
+    """Token counts for a response, including prompt-cache reads and writes."""
+    return {
+        "input_tokens": message.usage.input_tokens,
+        "output_tokens": message.usage.output_tokens,
+        "cache_read_input_tokens": message.usage.cache_read_input_tokens or 0,
+        "cache_creation_input_tokens": message.usage.cache_creation_input_tokens or 0,
+    }
+
+
 class LLMService:
-    def __init__(self, model: str = "claude-sonnet-4-20250514", max_tokens: int = 1024):
-        self.client = anthropic.Anthropic()
+    def __init__(self, model: str = "claude-sonnet-4-20250514", max_tokens: int = 1024, max_retries: int = 2):
+        self.client = anthropic.Anthropic(max_retries=max_retries)
         self.model = model
         self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self._async_client = None
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
-        """Generate a response from Claude."""
+    @classmethod
+    def from_config(cls, config) -> "LLMService":
+        """Build the service described by the `llm` config section."""
+        return cls(model=config.llm.model, max_tokens=config.llm.max_tokens, max_retries=config.llm.max_retries)
+
+    @traced("llm.generate")
+    def generate_multiturn(
+        self,
+        system_prompt: str | list[dict],
+        messages: list[dict],
+        usage: bool = False,
+    ) -> str | tuple[str, dict]:
+        """Generate a response from a multi-turn conversation.
+
+        With `usage`, returns (text, token usage) instead of just the text.
+        """
         response = self.client.messages.create(
             model=self.model,
             max_tokens=self.max_tokens,
             system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
         )
+        if usage:
+            return response.content[0].text, _usage(response)
         return response.content[0].text
 
-    def generate_multiturn(self, system_prompt: str, messages: list[dict]) -> str:
-        """Generate a response from a multi-turn conversation."""
-        response = self.client.messages.create(
+    def stream_multiturn(
+        self,
+        system_prompt: str | list[dict],
+        messages: list[dict],
+        usage: bool = False,
+    ) -> Iterator[str | dict]:
+        """Stream a multi-turn response, yielding text deltas as they arrive.
+
+        With `usage`, a dict of token usage follows the last delta.
+        """
+        with span("llm.stream", model=self.model), self.client.messages.stream(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=system_prompt,
+            messages=messages,
+        ) as stream:
+            yield from stream.text_stream
+            if usage:
+                yield _usage(stream.get_final_message())
+
+    @traced("llm.agenerate")
+    async def agenerate_multiturn(
+        self,
+        system_prompt: str | list[dict],
+        messages: list[dict],
+        usage: bool = False,
+    ) -> str | tuple[str, dict]:
+        """Async `generate_multiturn` for running many requests concurrently.
+
+        All calls share one `AsyncAnthropic` client and its connection pool.
+        Rate-limit (429), overload and 5xx responses are retried by the SDK
+        with exponential backoff that honours `retry-after`, up to
+        `max_retries` times.
+        """
+        if self._async_client is None:
+            self._async_client = anthropic.AsyncAnthropic(max_retries=self.max_retries)
+        response = await self._async_client.messages.create(
             model=self.model,
             max_tokens=self.max_tokens,
             system=system_prompt,
             messages=messages,
         )
+        if usage:
+            return response.content[0].text, _usage(response)
         return response.content[0].text
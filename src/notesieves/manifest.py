@@ -0,0 +1,72 @@
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+# Files modified this recently may still change within the same mtime tick,
+# so their hashes are not trusted on the next run ("racily clean" entries).
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class Manifest:
+    """Persisted map of file path → (size, mtime_ns, inode, hash).
+
+    Lets ingest skip re-hashing files whose stat tuple hasn't changed since
+    the last run, so a no-op ingest costs one `stat()` per file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: dict[str, list] = {}
+        self._dirty = False
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("files", {})
+
+    def lookup(self, file_path: str, stat: os.stat_result) -> str | None:
+        """Return the recorded hash if the file's stat tuple is unchanged."""
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        size, mtime_ns, inode, file_hash = entry
+        if (size, mtime_ns, inode) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return None
+        return file_hash
+
+    def record(self, file_path: str, stat: os.stat_result, file_hash: str):
+        """Remember the hash computed for a file at the given stat tuple."""
+        if time.time_ns() - stat.st_mtime_ns < _RACY_WINDOW_NS:
+            self.forget(file_path)
+            return
+        entry = [stat.st_size, stat.st_mtime_ns, stat.st_ino, file_hash]
+        if self.entries.get(file_path) != entry:
+            self.entries[file_path] = entry
+            self._dirty = True
+
+    def forget(self, file_path: str):
+        if self.entries.pop(file_path, None) is not None:
+            self._dirty = True
+
+    def prune(self, keep: set[str]):
+        """Drop entries for files that are no longer on disk."""
+        for file_path in set(self.entries) - keep:
+            self.forget(file_path)
+
+    def save(self):
+        """Atomically write the manifest if anything changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self.entries}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -1,3 +1,6 @@
+# Bump when any prompt below changes, so cached answers are not reused.
+PROMPT_VERSION = 1
+
 SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the user's personal notes.
 
 You will be given relevant excerpts from the user's markdown notes, along with metadata about where each excerpt comes from.
@@ -57,8 +60,13 @@ When evaluating + asking next:
 """
 
 
-def build_quiz_start_prompt(topic: str, context_chunks: list[dict]) -> str:
-    """Build the first quiz message with retrieved context."""
+def build_quiz_system(context_chunks: list[dict]) -> list[dict]:
+    """Build the quiz system prompt as cacheable blocks.
+
+    The instructions and the retrieved excerpts never change during a quiz,
+    so they are sent as the system prompt with a cache breakpoint after the
+    excerpts; every turn after the first reads them from the prompt cache.
+    """
     context_parts = []
 
     for i, chunk in enumerate(context_chunks, 1):
@@ -75,13 +83,27 @@ def build_quiz_start_prompt(topic: str, context_chunks: list[dict]) -> str:
 
     context_str = "\n\n".join(context_parts)
 
-    return (
-        f"Here are relevant excerpts from my notes:\n\n"
-        f"{context_str}\n\n"
-        f"---\n\n"
-        f"Quiz me about: {topic}\n\n"
-        f"Ask me one question to test my understanding."
-    )
+    return [
+        {"type": "text", "text": QUIZ_SYSTEM_PROMPT},
+        {
+            "type": "text",
+            "text": f"Here are relevant excerpts from the user's notes:\n\n{context_str}",
+            "cache_control": {"type": "ephemeral"},
+        },
+    ]
+
+
+def build_quiz_start_prompt(topic: str, asked: list[str] | None = None) -> str:
+    """Build the first quiz message; the excerpts live in the system prompt.
+
+    `asked` lists questions from turns that were compacted out of the
+    history, so they are not repeated.
+    """
+    prompt = f"Quiz me about: {topic}\n\nAsk me one question to test my understanding."
+    if asked:
+        asked_list = "\n".join(f"- {q}" for q in asked)
+        prompt += f"\n\nYou already asked these questions earlier in this session:\n{asked_list}"
+    return prompt
 
 
 def build_broad_user_prompt(question: str, file_map: dict[str, list[str]]) -> str:
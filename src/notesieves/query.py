@@ -1,109 +1,337 @@
+import re
+import time
+from collections.abc import Callable, Iterable
+
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.spinner import Spinner
 
+from .cache import AnswerCache, answer_key
 from .config import Config
-from .llm import LLMService
+from .context import pack_context
+from .daemon import connect
 from .prompts import (
+    PROMPT_VERSION,
     BROAD_SYSTEM_PROMPT,
-    QUIZ_SYSTEM_PROMPT,
     SYSTEM_PROMPT,
     build_broad_user_prompt,
     build_quiz_start_prompt,
+    build_quiz_system,
     build_user_prompt,
 )
-from .vectorstore import VectorStore
+from .trace import mark, span
 
 console = Console()
 
+_QUESTION_RE = re.compile(r"\*\*Question:\*\*\s*(.+)")
+
 
-def run_query(config: Config, question: str, broad: bool = False):
-    """Run the full query pipeline."""
-    with console.status("Loading embedding model..."):
+def _load_services(config: Config):
+    """Return (embedder, store, llm), preferring a running `nsie serve` daemon."""
+    with span("load.daemon_connect"):
+        client = connect(config)
+    if client is not None:
+        return client.embedder, client.store, client.llm
+
+    with console.status("Loading embedding model..."), span("load.embedding_model"):
         from .embeddings import EmbeddingService
-        embedder = EmbeddingService()
+        embedder = EmbeddingService.from_config(config)
+
+    with span("load.store"):
+        from .vectorstore import VectorStore
+        store = VectorStore(config.paths.database_directory)
+    with span("load.llm"):
+        from .llm import LLMService
+        llm = LLMService.from_config(config)
+    return embedder, store, llm
+
+
+def _reply(config: Config, llm, system_prompt: str | list[dict], messages: list[dict]) -> Callable[[], Iterable]:
+    """Return a callable producing the reply as text pieces followed by a usage dict."""
+    if config.llm.stream:
+        return lambda: llm.stream_multiturn(system_prompt, messages, usage=True)
+    return lambda: llm.generate_multiturn(system_prompt, messages, usage=True)
+
+
+def _render_reply(reply: Callable[[], Iterable], status: str, **panel_kwargs) -> tuple[str, float, dict]:
+    """Show a spinner, then render the reply in a live-updating Markdown panel.
+
+    While streaming, a reply taller than the terminal is cut off with an
+    ellipsis (redrawing overflow would copy it into the scrollback on every
+    refresh); the live view is then cleared and the full panel printed once.
+    Returns the full text, the `perf_counter()` time its first piece arrived
+    and the token usage reported by the API.
+    """
+    text = ""
+    first_token_at = None
+    usage = {}
+    with Live(
+        Spinner("dots", text=status),
+        console=console,
+        refresh_per_second=12,
+        vertical_overflow="ellipsis",
+        transient=True,
+    ) as live:
+        try:
+            for delta in reply():
+                if isinstance(delta, dict):
+                    usage = delta
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    mark("llm.first_token")
+                text += delta
+                live.update(Panel(Markdown(text), **panel_kwargs))
+        finally:
+            # Live redraws its last renderable uncropped on exit; make that nothing.
+            live.update("")
+    if text:
+        console.print(Panel(Markdown(text), **panel_kwargs))
+    return text, first_token_at or time.perf_counter(), usage
+
+
+def _print_timing(**spans: float):
+    """Print named durations (seconds) on one dim line."""
+    parts = [f"{name.replace('_', ' ')} {seconds * 1000:.0f} ms" for name, seconds in spans.items()]
+    console.print(f"[dim]{' · '.join(parts)}[/dim]")
+
+
+def _print_context(stats: dict):
+    """Print how much the retrieved context shrank when it was packed."""
+    console.print(
+        f"[dim]context {stats['chunks']} chunks → {stats['passages']} passages · "
+        f"{stats['tokens_before']} → {stats['tokens_after']} tokens ({stats['tokens_saved']} saved)[/dim]"
+    )
+
+
+def _print_usage(usage: dict):
+    """Print prompt size and how much of it came from the prompt cache."""
+    if not usage:
+        return
+    cached = usage["cache_read_input_tokens"]
+    prompt = usage["input_tokens"] + cached + usage["cache_creation_input_tokens"]
+    console.print(
+        f"[dim]prompt {prompt} tokens · {cached} cached ({cached / max(prompt, 1):.0%}) · "
+        f"{usage['cache_creation_input_tokens']} cache write · {usage['input_tokens']} uncached · "
+        f"{usage['output_tokens']} output[/dim]"
+    )
 
-    store = VectorStore(config.paths.database_directory)
-    llm = LLMService(model=config.llm.model, max_tokens=config.llm.max_tokens)
+
+def _with_cache_breakpoint(messages: list[dict]) -> list[dict]:
+    """Copy of `messages` with a prompt-cache breakpoint on the last one.
+
+    Moving the breakpoint forward every turn lets the next request read the
+    whole conversation so far from the cache and process only the new turn.
+    """
+    last = messages[-1]
+    return [
+        *messages[:-1],
+        {
+            "role": last["role"],
+            "content": [{"type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"}}],
+        },
+    ]
+
+
+def _compact_history(topic: str, messages: list[dict], keep: int, asked: list[str]) -> list[dict]:
+    """Drop all but the last `keep` exchanges of a quiz conversation.
+
+    Questions from the dropped assistant turns are appended to `asked` and
+    listed in the new opening message so they are not repeated.
+    """
+    dropped = messages[1:-2 * keep]
+    for message in dropped:
+        if message["role"] == "assistant":
+            asked.extend(q.strip() for q in _QUESTION_RE.findall(message["content"]))
+    return [
+        {"role": "user", "content": build_quiz_start_prompt(topic, asked)},
+        *messages[-2 * keep:],
+    ]
+
+
+def run_query(
+    config: Config,
+    question: str,
+    broad: bool = False,
+    timing: bool = False,
+    use_cache: bool = True,
+    filters: dict | None = None,
+):
+    """Run the full query pipeline.
+
+    Answers are cached per question and retrieval result; `use_cache=False`
+    skips the lookup and replaces any cached answer with a fresh one.
+    `filters` restrict retrieval to matching notes (see `VectorStore.search`).
+    """
+    started_at = time.perf_counter()
+    with span("load"):
+        embedder, store, llm = _load_services(config)
+    loaded_at = time.perf_counter()
 
     if store.count() == 0:
         console.print("[red]No notes indexed yet. Run 'nsie ingest' first.[/red]")
         return
 
     if broad:
-        with console.status("Scanning notes..."):
-            query_embedding = embedder.embed_text(question)
-            file_map = store.search_broad(query_embedding, top_k=30)
+        with console.status("Scanning notes..."), span("retrieve"):
+            query_embedding = embedder.embed_query(question)
+            file_map = store.search_broad(
+                query_embedding, top_k=30, files=config.retrieval.broad_files, filters=filters
+            )
 
         if not file_map:
             console.print("[yellow]No relevant content found in your notes.[/yellow]")
             return
 
-        with console.status("Generating answer..."):
+        system_prompt = BROAD_SYSTEM_PROMPT
+        with span("prompt.build"):
             user_prompt = build_broad_user_prompt(question, file_map)
-            answer = llm.generate(BROAD_SYSTEM_PROMPT, user_prompt)
+        sources = file_map
     else:
         with console.status("Searching notes..."):
-            query_embedding = embedder.embed_text(question)
-            chunks = store.search(query_embedding, top_k=config.retrieval.top_k)
+            with span("retrieve"):
+                query_embedding = embedder.embed_query(question)
+                chunks = store.search(
+                    query_embedding,
+                    top_k=config.retrieval.top_k,
+                    query_text=question if config.retrieval.hybrid else None,
+                    candidates=config.retrieval.candidates,
+                    filters=filters,
+                    max_postings=config.retrieval.lexical_max_postings,
+                )
+            with span("context.pack", chunks=len(chunks)) as packing:
+                passages, context_stats = pack_context(chunks, embedder.count_tokens, config.retrieval.context_token_budget)
+                packing.set(tokens=context_stats["tokens_after"])
 
         if not chunks:
             console.print("[yellow]No relevant content found in your notes.[/yellow]")
             return
 
-        with console.status("Generating answer..."):
-            user_prompt = build_user_prompt(question, chunks)
-            answer = llm.generate(SYSTEM_PROMPT, user_prompt)
+        system_prompt = SYSTEM_PROMPT
+        with span("prompt.build"):
+            user_prompt = build_user_prompt(question, passages)
+        sources = [[c["id"], c["metadata"].get("file_hash", "")] for c in chunks]
 
+    retrieved_at = time.perf_counter()
     console.print()
-    console.print(Panel(
-        Markdown(answer),
-        title="[bold]Answer[/bold]",
-        border_style="green",
-    ))
 
+    with span("answer_cache.lookup"):
+        cache = AnswerCache.from_config(config)
+        key = answer_key(
+            question,
+            "broad" if broad else "detailed",
+            config.llm.model,
+            PROMPT_VERSION,
+            sources,
+            config.retrieval.context_token_budget,
+        )
+        cached = cache.get(key) if use_cache else None
+    if cached is not None:
+        cache.close()
+        console.print(Panel(
+            Markdown(cached),
+            title="[bold]Answer[/bold]",
+            subtitle="[dim]cached[/dim]",
+            border_style="green",
+        ))
+        if timing:
+            _print_timing(
+                load=loaded_at - started_at,
+                retrieval=retrieved_at - loaded_at,
+                total=time.perf_counter() - started_at,
+            )
+            if not broad:
+                _print_context(context_stats)
+        return
 
-def run_quiz(config: Config, topic: str):
-    """Run an interactive quiz session."""
-    with console.status("Loading embedding model..."):
-        from .embeddings import EmbeddingService
-        embedder = EmbeddingService()
+    messages = [{"role": "user", "content": user_prompt}]
+    with span("llm", model=config.llm.model) as answering:
+        answer, first_token_at, usage = _render_reply(
+            _reply(config, llm, system_prompt, messages),
+            "Generating answer...",
+            title="[bold]Answer[/bold]",
+            border_style="green",
+        )
+        answering.set(**usage)
+    with span("answer_cache.store"):
+        if answer:
+            cache.put(key, answer)
+            cache.evict()
+        cache.close()
+
+    if timing:
+        finished_at = time.perf_counter()
+        _print_timing(
+            load=loaded_at - started_at,
+            retrieval=retrieved_at - loaded_at,
+            first_token=first_token_at - retrieved_at,
+            total=finished_at - started_at,
+        )
+        if not broad:
+            _print_context(context_stats)
+        _print_usage(usage)
 
-    store = VectorStore(config.paths.database_directory)
-    llm = LLMService(model=config.llm.model, max_tokens=config.llm.max_tokens)
+
+def run_quiz(config: Config, topic: str, timing: bool = False, filters: dict | None = None):
+    """Run an interactive quiz session."""
+    with span("load"):
+        embedder, store, llm = _load_services(config)
 
     if store.count() == 0:
         console.print("[red]No notes indexed yet. Run 'nsie ingest' first.[/red]")
         return
 
     with console.status("Searching notes..."):
-        query_embedding = embedder.embed_text(topic)
-        chunks = store.search(query_embedding, top_k=15)
+        with span("retrieve"):
+            query_embedding = embedder.embed_query(topic)
+            chunks = store.search(
+                query_embedding,
+                top_k=15,
+                query_text=topic if config.retrieval.hybrid else None,
+                candidates=config.retrieval.candidates,
+                filters=filters,
+                max_postings=config.retrieval.lexical_max_postings,
+            )
+        with span("context.pack", chunks=len(chunks)) as packing:
+            passages, context_stats = pack_context(chunks, embedder.count_tokens, config.retrieval.context_token_budget)
+            packing.set(tokens=context_stats["tokens_after"])
 
     if not chunks:
         console.print("[yellow]No relevant content found in your notes.[/yellow]")
         return
 
-    # Build the first message with context
-    first_message = build_quiz_start_prompt(topic, chunks)
-    messages = [{"role": "user", "content": first_message}]
+    # The instructions and excerpts are a cached system prompt; the
+    # conversation itself starts with a short request.
+    with span("prompt.build"):
+        system_prompt = build_quiz_system(passages)
+    messages = [{"role": "user", "content": build_quiz_start_prompt(topic)}]
+    asked: list[str] = []
+    max_turns = config.llm.quiz_max_turns
 
     console.print()
     console.print(f"[bold]Quiz: {topic}[/bold]")
+    if timing:
+        _print_context(context_stats)
     console.print("[dim]Type your answer, or 'quit' to stop.[/dim]\n")
 
     try:
         while True:
-            with console.status("Thinking..."):
-                response = llm.generate_multiturn(QUIZ_SYSTEM_PROMPT, messages)
+            asked_at = time.perf_counter()
+            with span("llm", model=config.llm.model, turn=len(messages) // 2 + 1) as answering:
+                response, first_token_at, usage = _render_reply(
+                    _reply(config, llm, system_prompt, _with_cache_breakpoint(messages)),
+                    "Thinking...",
+                    border_style="blue",
+                )
+                answering.set(**usage)
+            if timing:
+                _print_timing(first_token=first_token_at - asked_at, total=time.perf_counter() - asked_at)
+                _print_usage(usage)
 
             messages.append({"role": "assistant", "content": response})
 
-            console.print(Panel(
-                Markdown(response),
-                border_style="blue",
-            ))
-
             answer = console.input("[bold]Your answer:[/bold] ")
 
             if answer.strip().lower() in ("quit", "q", "exit"):
@@ -111,6 +339,11 @@ def run_quiz(config: Config, topic: str):
 
             messages.append({"role": "user", "content": answer})
 
+            # Past the limit, fold the older half of the history away in one
+            # step, so the cached prefix is rebuilt rarely rather than every turn.
+            if max_turns and len(messages) > 2 * max_turns + 1:
+                messages = _compact_history(topic, messages, max(max_turns // 2, 1), asked)
+
     except KeyboardInterrupt:
         pass
 
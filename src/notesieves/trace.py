@@ -0,0 +1,210 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+_tracer: "Tracer | None" = None
+
+
+class Tracer:
+    """Collects timed spans from every thread of this process.
+
+    Each span is kept as (name, start ns, end ns, thread number, depth,
+    args, phase), where depth is how many spans were open on its thread
+    when it started and phase is "X" for a span, "b" for one that may
+    overlap others on its thread (coroutines) and "i" for an instant mark.
+    """
+
+    def __init__(self):
+        self.spans: list[tuple] = []
+        self.started_ns = time.perf_counter_ns()
+        self.local = threading.local()
+        self._threads: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start_ns: int, end_ns: int, depth: int, args: dict, phase: str = "X"):
+        ident = threading.get_ident()
+        with self._lock:
+            thread = self._threads.setdefault(ident, len(self._threads))
+            self.spans.append((name, start_ns, end_ns, thread, depth, args, phase))
+
+    def summary(self) -> list[dict]:
+        """Per-name totals, in order of first appearance: depth, calls, total/mean/max seconds."""
+        rows: dict[str, dict] = {}
+        for name, start, end, _, depth, _, phase in sorted(self.spans, key=lambda s: s[1]):
+            if phase == "i":
+                continue
+            row = rows.setdefault(name, {"name": name, "depth": depth, "calls": 0, "total": 0.0, "max": 0.0})
+            seconds = (end - start) / 1e9
+            row["calls"] += 1
+            row["total"] += seconds
+            row["max"] = max(row["max"], seconds)
+        for row in rows.values():
+            row["mean"] = row["total"] / row["calls"]
+        return list(rows.values())
+
+    def wall_seconds(self) -> float:
+        if not self.spans:
+            return 0.0
+        return (max(s[2] for s in self.spans) - min(s[1] for s in self.spans)) / 1e9
+
+    def chrome_trace(self) -> dict:
+        """The spans in Chrome trace event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "nsie"}}]
+        for i, (name, start, end, thread, _, args, phase) in enumerate(self.spans):
+            event = {
+                "name": name,
+                "cat": name.split(".")[0],
+                "pid": pid,
+                "tid": thread,
+                "ts": (start - self.started_ns) / 1000,
+                "args": args,
+            }
+            if phase == "X":
+                events.append({**event, "ph": "X", "dur": (end - start) / 1000})
+            elif phase == "i":
+                events.append({**event, "ph": "i", "s": "t"})
+            else:
+                events.append({**event, "ph": "b", "id": i})
+                events.append({**event, "ph": "e", "id": i, "ts": (end - self.started_ns) / 1000, "args": {}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Path):
+        path.write_text(json.dumps(self.chrome_trace(), default=str))
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start", "depth")
+
+    def __init__(self, tracer: Tracer, name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        local = self.tracer.local
+        self.depth = getattr(local, "depth", 0)
+        local.depth = self.depth + 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.tracer.local.depth = self.depth
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, end, self.depth, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach more arguments to the span (shown in the trace viewer)."""
+        self.args.update(args)
+
+
+class _NoSpan:
+    """What `span` returns while tracing is off: a shared do-nothing context."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start() -> Tracer:
+    """Start collecting spans in this process (replacing any current tracer)."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop() -> Tracer | None:
+    """Stop collecting spans; returns the tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name: str, **args):
+    """Context manager timing the block as `name`; costs one global lookup when tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return _Span(tracer, name, args)
+
+
+def mark(name: str, **args):
+    """Record an instant event, such as the first streamed token."""
+    tracer = _tracer
+    if tracer is not None:
+        now = time.perf_counter_ns()
+        tracer.record(name, now, now, getattr(tracer.local, "depth", 0), args, phase="i")
+
+
+def traced(name: str):
+    """Decorator timing every call of a function or coroutine as a span.
+
+    Coroutine spans may overlap on one thread, so they are recorded as
+    async events and do not nest.
+    """
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer is None:
+                    return await fn(*args, **kwargs)
+                started = time.perf_counter_ns()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    depth = getattr(tracer.local, "depth", 0)
+                    tracer.record(name, started, time.perf_counter_ns(), depth, {}, phase="b")
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def print_profile(tracer: Tracer, console):
+    """Print a table of time per stage, nested by where each stage was first seen."""
+    from rich.table import Table
+
+    wall = tracer.wall_seconds()
+    table = Table(title=f"Profile ({wall * 1000:,.1f} ms)", title_justify="left")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Mean ms", justify="right")
+    table.add_column("Max ms", justify="right")
+    table.add_column("% of wall", justify="right")
+    for row in tracer.summary():
+        table.add_row(
+            "  " * row["depth"] + row["name"],
+            str(row["calls"]),
+            f"{row['total'] * 1000:,.1f}",
+            f"{row['mean'] * 1000:,.2f}",
+            f"{row['max'] * 1000:,.1f}",
+            f"{row['total'] / wall:.0%}" if wall else "",
+        )
+    console.print()
+    console.print(table)
@@ -1,6 +1,46 @@
 from pathlib import Path
 
 import chromadb
+import numpy as np
+
+from .catalog import FileCatalog, catalog_path
+from .lexical import LexicalIndex, lexical_path
+from .trace import span, traced
+
+# Files per `$in` filter; keeps Chroma's SQL well under SQLite's variable limit.
+_WHERE_IN_LIMIT = 500
+
+# Reciprocal rank fusion constant (Cormack et al.); damps the weight of top ranks.
+_RRF_K = 60
+
+# Broad mode sends a note's whole heading list when it is at most this long,
+# and only searches its chunks for the relevant headings otherwise.
+_MAX_SUMMARY_HEADINGS = 8
+
+
+def _batched(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _file_mtime(file_path: str) -> float | None:
+    try:
+        return Path(file_path).stat().st_mtime
+    except OSError:
+        return None
+
+
+def _all_of(clauses: list[dict]) -> dict | None:
+    """Combine `where` clauses with $and (Chroma wants at least two operands)."""
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _any_of(key: str, values: list[str]) -> dict:
+    """`key` is one of `values`, split into several `$in` clauses if long."""
+    clauses = [{key: {"$in": batch}} for batch in _batched(values, _WHERE_IN_LIMIT)]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
 
 
 class VectorStore:
@@ -11,53 +51,405 @@ class VectorStore:
             name=collection_name,
             metadata={"hnsw:space": "cosine"},
         )
+        self.catalog = FileCatalog(catalog_path(persist_directory, collection_name))
+        if self.catalog.totals()[0] == 0 and self.collection.count() > 0:
+            self._rebuild_catalog()
+        self.lexical = LexicalIndex(lexical_path(persist_directory, collection_name))
+        if self.lexical.count() == 0 and self.collection.count() > 0:
+            self._rebuild_lexical()
+        self.summaries = self.client.get_or_create_collection(
+            name=f"{collection_name}_summaries",
+            metadata={"hnsw:space": "cosine"},
+        )
+        if self.collection.count() > 0 and self._missing_filter_fields():
+            self._backfill_filter_fields()
+        if self.summaries.count() == 0 and self.collection.count() > 0:
+            self._refresh_summaries([row["path"] for row in self.catalog.iter_files()])
 
-    def add_chunks(self, chunks: list, embeddings: list[list[float]]):
-        """Add chunks with their embeddings to the store."""
-        ids = []
-        for c in chunks:
-            file_hash = c.metadata.get("file_hash", "nohash")
-            chunk_index = c.metadata.get("chunk_index", 0)
-            ids.append(f"{file_hash}_{chunk_index}")
+    def _rebuild_catalog(self, page_size: int = 10_000):
+        """Build the catalog from chunk metadata (indexes created before it existed)."""
+        files: dict[str, dict] = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for meta in page["metadatas"]:
+                fp = meta.get("file_path", "")
+                if not fp:
+                    continue
+                row = files.get(fp)
+                if row is None:
+                    row = files[fp] = {
+                        "path": fp,
+                        "name": meta.get("file_name", Path(fp).stem),
+                        "hash": meta.get("file_hash") or None,
+                        "chunk_count": 0,
+                        "mtime": meta.get("mtime", _file_mtime(fp)),
+                    }
+                row["chunk_count"] += 1
+                if row["hash"] != meta.get("file_hash"):
+                    row["hash"] = None
+            offset += len(page["ids"])
+        self.catalog.record(list(files.values()))
+
+    def _rebuild_lexical(self, page_size: int = 10_000):
+        """Build the lexical index from stored chunks (indexes created before it existed)."""
+        from .chunker import Chunk
+
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            self.lexical.add([
+                Chunk(text=text, metadata=meta, id=chunk_id)
+                for chunk_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"])
+            ])
+            offset += len(page["ids"])
+        self.lexical.optimize()
+
+    def _missing_filter_fields(self) -> bool:
+        sample = self.collection.get(limit=1, include=["metadatas"])["metadatas"]
+        return bool(sample) and "folder" not in sample[0]
+
+    def _backfill_filter_fields(self, page_size: int = 10_000):
+        """Add the `folder` and `mtime` filter fields to chunks indexed without them.
+
+        Files the catalog has no mtime for get their current one, which is
+        also written back to the catalog.
+        """
+        rows = list(self.catalog.iter_files())
+        stale = [row for row in rows if row["mtime"] is None]
+        for row in stale:
+            row["mtime"] = _file_mtime(row["path"])
+        self.catalog.record([row for row in stale if row["mtime"] is not None])
+        mtimes = {row["path"]: row["mtime"] for row in rows}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for meta in page["metadatas"]:
+                fp = meta.get("file_path", "")
+                meta["folder"] = str(Path(fp).parent)
+                if mtimes.get(fp) is not None:
+                    meta["mtime"] = mtimes[fp]
+            self.collection.update(ids=page["ids"], metadatas=page["metadatas"])
+            offset += len(page["ids"])
+        self._refresh_summaries(list(mtimes))
+
+    def _refresh_summaries(self, file_paths: list[str]):
+        """Recompute the per-note summary vectors of the given files.
 
-        self.collection.add(
-            ids=ids,
+        A note's summary is the normalized centroid of its chunk vectors,
+        stored with its heading list in the small `<collection>_summaries`
+        collection that broad mode searches first.
+        """
+        for batch in _batched(file_paths, _WHERE_IN_LIMIT):
+            stored = self.collection.get(
+                where={"file_path": {"$in": batch}},
+                include=["embeddings", "metadatas"],
+            )
+            files: dict[str, dict] = {}
+            for vector, meta in zip(stored["embeddings"], stored["metadatas"]):
+                entry = files.setdefault(meta["file_path"], {
+                    "name": meta.get("file_name", ""),
+                    "mtime": meta.get("mtime"),
+                    "chunks": [],
+                })
+                entry["chunks"].append((meta.get("chunk_index", 0), meta.get("heading_hierarchy", ""), vector))
+
+            ids, embeddings, documents, metadatas = [], [], [], []
+            for fp, entry in files.items():
+                entry["chunks"].sort(key=lambda c: c[0])
+                vectors = np.array([c[2] for c in entry["chunks"]], dtype=np.float32)
+                vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+                centroid = vectors.mean(axis=0)
+                centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+                headings = list(dict.fromkeys(c[1] for c in entry["chunks"] if c[1]))
+
+                ids.append(fp)
+                embeddings.append(centroid.tolist())
+                documents.append("\n".join(headings))
+                meta = {
+                    "file_path": fp,
+                    "file_name": entry["name"],
+                    "folder": str(Path(fp).parent),
+                    "heading_count": len(headings),
+                }
+                if entry["mtime"] is not None:
+                    meta["mtime"] = entry["mtime"]
+                metadatas.append(meta)
+
+            if ids:
+                self.summaries.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+            gone = [fp for fp in batch if fp not in files]
+            if gone:
+                self.summaries.delete(ids=gone)
+
+    def _upsert(self, chunks: list, embeddings: list[list[float]]):
+        self.collection.upsert(
+            ids=[c.id for c in chunks],
             embeddings=embeddings,
             documents=[c.text for c in chunks],
             metadatas=[c.metadata for c in chunks],
         )
+        self.lexical.add(chunks)
 
-    def search(self, query_embedding: list[float], top_k: int = 5) -> list[dict]:
-        """Search for similar chunks."""
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"],
-        )
+    @traced("store.add_chunks")
+    def add_chunks(self, chunks: list, embeddings: list[list[float]]):
+        """Add chunks with their embeddings to the store.
+
+        As in `replace_files`, the files are marked pending in the catalog
+        before the write and recorded after it. Chunks without an `mtime`
+        get their file's modification time, when the file exists.
+        """
+        files = {}
+        for c in chunks:
+            fp = c.metadata["file_path"]
+            if fp in files:
+                mtime = files[fp]["mtime"]
+            else:
+                mtime = c.metadata.get("mtime", _file_mtime(fp))
+            if mtime is not None:
+                c.metadata.setdefault("mtime", mtime)
+            files[fp] = {
+                "path": fp,
+                "name": c.metadata.get("file_name", ""),
+                "hash": c.metadata.get("file_hash"),
+                "chunk_count": c.metadata.get("total_chunks_in_file", 0),
+                "mtime": mtime,
+            }
+        self.catalog.mark_pending(list(files))
+        self._upsert(chunks, embeddings)
+        self._refresh_summaries(list(files))
+        self.catalog.record(list(files.values()))
+
+    @traced("store.filters")
+    def _where(self, filters: dict | None) -> tuple[dict | None, dict | None] | None:
+        """Translate note filters into `where` clauses for chunks and summaries.
+
+        `filters` may hold `path` (absolute glob), `heading` (substring of a
+        heading, case-sensitive), `since` (Unix time) and `file` (note name).
+        Globs ending in `/*` become a `folder` match; other globs and
+        headings are expanded against the catalog and the summary heading
+        lists first. Returns None when no note can match.
+        """
+        chunk_clauses, summary_clauses = [], []
+        filters = filters or {}
+
+        if filters.get("file"):
+            clause = {"file_name": filters["file"]}
+            chunk_clauses.append(clause)
+            summary_clauses.append(clause)
 
-        chunks = []
-        for i in range(len(results["ids"][0])):
-            chunks.append({
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i],
+        if filters.get("since") is not None:
+            clause = {"mtime": {"$gte": float(filters["since"])}}
+            chunk_clauses.append(clause)
+            summary_clauses.append(clause)
+
+        if filters.get("path"):
+            paths = self.catalog.match(filters["path"])
+            if not paths:
+                return None
+            prefix = filters["path"].rstrip("*")
+            if prefix.endswith("/") and not any(c in prefix for c in "*?["):
+                # Everything under a folder: match the folders holding those
+                # files rather than listing each file.
+                clause = _any_of("folder", sorted({str(Path(p).parent) for p in paths}))
+            else:
+                clause = _any_of("file_path", paths)
+            chunk_clauses.append(clause)
+            summary_clauses.append(clause)
+
+        if filters.get("heading"):
+            found = self.summaries.get(
+                where_document={"$contains": filters["heading"]},
+                include=["documents", "metadatas"],
+            )
+            hierarchies = sorted({
+                line for document in found["documents"] for line in document.split("\n") if filters["heading"] in line
             })
-        return chunks
+            if not hierarchies:
+                return None
+            chunk_clauses.append(_any_of("heading_hierarchy", hierarchies))
+            summary_clauses.append(_any_of("file_path", [meta["file_path"] for meta in found["metadatas"]]))
+
+        return _all_of(chunk_clauses), _all_of(summary_clauses)
+
+    def search(
+        self,
+        query_embedding: list[float],
+        top_k: int = 5,
+        query_text: str | None = None,
+        candidates: int = 20,
+        filters: dict | None = None,
+        max_postings: int = 0,
+    ) -> list[dict]:
+        """Search for similar chunks (hybrid with BM25 when `query_text` is given)."""
+        return self.search_many(
+            [query_embedding],
+            top_k=top_k,
+            query_texts=None if query_text is None else [query_text],
+            candidates=candidates,
+            filters=filters,
+            max_postings=max_postings,
+        )[0]
+
+    @traced("store.search")
+    def search_many(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int = 5,
+        query_texts: list[str] | None = None,
+        candidates: int = 20,
+        filters: dict | None = None,
+        max_postings: int = 0,
+    ) -> list[list[dict]]:
+        """Search for several queries in one Chroma call; one result list per query.
+
+        With `query_texts`, the top `candidates` dense and BM25 matches for
+        each query are merged by reciprocal rank fusion, and each result
+        carries its fused `score`; lexical-only hits have no `distance`.
+        `filters` (see `_where`) restrict both to matching notes inside
+        Chroma, before the nearest neighbours are picked. `max_postings`
+        bounds the BM25 lookup (see `LexicalIndex.search`).
+        """
+        resolved = self._where(filters)
+        if resolved is None:
+            return [[] for _ in query_embeddings]
+        where = resolved[0]
+
+        hybrid = query_texts is not None
+        with span("chroma.query", queries=len(query_embeddings)):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=max(top_k, candidates) if hybrid else top_k,
+                where=where,
+                include=["documents", "metadatas", "distances"],
+            )
+
+        matches = []
+        for q in range(len(query_embeddings)):
+            chunks = []
+            for i in range(len(results["ids"][q])):
+                chunks.append({
+                    "id": results["ids"][q][i],
+                    "text": results["documents"][q][i],
+                    "metadata": results["metadatas"][q][i],
+                    "distance": results["distances"][q][i],
+                })
+            matches.append(chunks)
+
+        if hybrid:
+            with span("store.lexical"):
+                lexical = [self.lexical.search(text, max(top_k, candidates), max_postings) for text in query_texts]
+            if where is not None:
+                # The lexical index knows nothing of the filter fields, so its
+                # hits are checked against Chroma before fusion.
+                lexical_ids = sorted({i for ids in lexical for i in ids})
+                allowed = set(self.collection.get(ids=lexical_ids, where=where, include=[])["ids"]) if lexical_ids else set()
+                lexical = [[i for i in ids if i in allowed] for ids in lexical]
+            matches = self._fuse(matches, lexical, top_k)
+        return matches
+
+    @traced("store.fuse")
+    def _fuse(self, dense: list[list[dict]], lexical: list[list[str]], top_k: int) -> list[list[dict]]:
+        """Merge dense and lexical rankings per query with reciprocal rank fusion."""
+        fused_scores = []
+        for dense_chunks, lexical_ids in zip(dense, lexical):
+            scores: dict[str, float] = {}
+            for ranking in ([c["id"] for c in dense_chunks], lexical_ids):
+                for rank, chunk_id in enumerate(ranking, 1):
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (_RRF_K + rank)
+            top = sorted(scores, key=scores.get, reverse=True)[:top_k]
+            fused_scores.append({chunk_id: scores[chunk_id] for chunk_id in top})
+
+        # Lexical-only hits still need their text and metadata from Chroma.
+        known = {c["id"]: c for chunks in dense for c in chunks}
+        missing = sorted({i for scores in fused_scores for i in scores} - known.keys())
+        if missing:
+            found = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, meta in zip(found["ids"], found["documents"], found["metadatas"]):
+                known[chunk_id] = {"id": chunk_id, "text": text, "metadata": meta, "distance": None}
 
+        return [
+            [{**known[i], "score": score} for i, score in scores.items() if i in known]
+            for scores in fused_scores
+        ]
+
+    @traced("store.get_file_hashes")
     def get_file_hashes(self) -> dict[str, str]:
-        """Return a mapping of file_path → file_hash for all indexed files."""
-        results = self.collection.get(include=["metadatas"])
-        file_hashes = {}
-        for meta in results["metadatas"]:
-            fp = meta.get("file_path", "")
-            fh = meta.get("file_hash", "")
-            if fp and fh:
-                file_hashes[fp] = fh
-        return file_hashes
-
-    def delete_by_file(self, file_path: str):
-        """Delete all chunks belonging to a specific file."""
-        self.collection.delete(where={"file_path": file_path})
+        """Return a mapping of file_path → file_hash for all indexed files.
+
+        Files interrupted mid-update map to "" so they are treated as changed.
+        """
+        return self.catalog.hashes()
+
+    @traced("store.get_ids_by_files")
+    def get_ids_by_files(self, file_paths: list[str]) -> dict[str, list[str]]:
+        """Return file_path → chunk IDs for many files in few round trips."""
+        ids: dict[str, list[str]] = {}
+        for batch in _batched(file_paths, _WHERE_IN_LIMIT):
+            result = self.collection.get(where={"file_path": {"$in": batch}}, include=["metadatas"])
+            for chunk_id, meta in zip(result["ids"], result["metadatas"]):
+                ids.setdefault(meta["file_path"], []).append(chunk_id)
+        return ids
+
+    @traced("store.replace_files")
+    def replace_files(self, updates: list[dict]):
+        """Apply chunk diffs for many files with one write per operation kind.
+
+        Each update has path, hash, mtime, added, embeddings, kept and
+        removed_ids. New chunks are upserted, stale ones deleted and kept
+        chunks only get their metadata rewritten (index, hash), so their
+        vectors stay untouched in the HNSW index. Every file is marked
+        pending in the catalog before the first write and recorded only
+        after the last one, so a crash in between leaves the files flagged
+        as changed and the next ingest redoes them.
+        """
+        if not updates:
+            return
+        added = [c for u in updates for c in u["added"]]
+        embeddings = [e for u in updates for e in u["embeddings"]]
+        kept = [c for u in updates for c in u["kept"]]
+        removed_ids = [i for u in updates for i in u["removed_ids"]]
+        limit = self.client.get_max_batch_size()
+
+        self.catalog.mark_pending([u["path"] for u in updates])
+        for start in range(0, len(added), limit):
+            self._upsert(added[start:start + limit], embeddings[start:start + limit])
+        for batch in _batched(removed_ids, limit):
+            self.collection.delete(ids=batch)
+        self.lexical.delete_ids(removed_ids)
+        for batch in _batched(kept, limit):
+            self.collection.update(ids=[c.id for c in batch], metadatas=[c.metadata for c in batch])
+        self._refresh_summaries([u["path"] for u in updates])
+        self.catalog.record([{
+            "path": u["path"],
+            "name": Path(u["path"]).stem,
+            "hash": u["hash"],
+            "chunk_count": len(u["added"]) + len(u["kept"]),
+            "mtime": u["mtime"],
+        } for u in updates])
+
+    @traced("store.delete_files")
+    def delete_files(self, file_paths: list[str]):
+        """Delete all chunks belonging to many files in batched writes.
+
+        Files stay marked pending in the catalog until their chunks are gone,
+        so an interrupted delete is retried by the next ingest.
+        """
+        if not file_paths:
+            return
+        self.catalog.mark_pending(file_paths)
+        for batch in _batched(file_paths, _WHERE_IN_LIMIT):
+            self.collection.delete(where={"file_path": {"$in": batch}})
+        self.lexical.delete_files(file_paths)
+        for batch in _batched(file_paths, self.client.get_max_batch_size()):
+            self.summaries.delete(ids=batch)
+        self.catalog.remove(file_paths)
 
     def clear(self):
         """Delete all documents in the collection."""
@@ -66,31 +458,87 @@ class VectorStore:
             name=self.collection_name,
             metadata={"hnsw:space": "cosine"},
         )
-
-    def search_broad(self, query_embedding: list[float], top_k: int = 30) -> dict[str, list[str]]:
-        """Search and return unique file→headings map (no document text)."""
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(top_k, self.collection.count()),
-            include=["metadatas"],
+        self.client.delete_collection(self.summaries.name)
+        self.summaries = self.client.get_or_create_collection(
+            name=f"{self.collection_name}_summaries",
+            metadata={"hnsw:space": "cosine"},
         )
+        self.catalog.clear()
+        self.lexical.clear()
+
+    @traced("store.search_broad")
+    def search_broad(
+        self,
+        query_embedding: list[float],
+        top_k: int = 30,
+        files: int = 15,
+        filters: dict | None = None,
+    ) -> dict[str, list[str]]:
+        """Search and return unique file→headings map (no document text).
 
+        Finds the `files` notes whose summary vectors are closest to the
+        query, so one long note cannot crowd out the others. Notes with a
+        short heading list are returned whole; for longer ones, the query's
+        best `top_k` chunks pick the relevant headings (falling back to the
+        first few when none of them landed in that note). `filters` are
+        applied as in `search_many`; with a `heading` filter, only the
+        headings containing it are listed.
+        """
+        resolved = self._where(filters)
+        n_files = min(files, self.summaries.count())
+        if n_files == 0 or resolved is None:
+            return {}
+        chunk_where, summary_where = resolved
+        with span("chroma.query_summaries"):
+            results = self.summaries.query(
+                query_embeddings=[query_embedding],
+                n_results=n_files,
+                where=summary_where,
+                include=["documents", "metadatas"],
+            )
+
+        heading = (filters or {}).get("heading")
         file_map: dict[str, set[str]] = {}
-        for meta in results["metadatas"][0]:
+        long_notes: dict[str, tuple[str, list[str]]] = {}
+        for document, meta in zip(results["documents"][0], results["metadatas"][0]):
             name = meta.get("file_name", "Unknown")
-            heading = meta.get("heading_hierarchy", "")
-            if name not in file_map:
-                file_map[name] = set()
-            if heading:
-                file_map[name].add(heading)
+            # The same substring match `_where` applies to chunk headings.
+            headings = [h for h in document.split("\n") if h and (not heading or heading in h)]
+            if heading and not headings:
+                continue
+            file_map.setdefault(name, set())
+            if len(headings) <= _MAX_SUMMARY_HEADINGS:
+                file_map[name].update(headings)
+            else:
+                long_notes[meta["file_path"]] = (name, headings)
+
+        if long_notes:
+            # Not restricted to the long notes: an extra `$in` filter costs
+            # more in Chroma than ignoring hits elsewhere.
+            with span("chroma.query", queries=1):
+                chunks = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=min(top_k, self.catalog.totals()[1]),
+                    where=chunk_where,
+                    include=["metadatas"],
+                )
+            for meta in chunks["metadatas"][0]:
+                hierarchy = meta.get("heading_hierarchy", "")
+                if hierarchy and meta["file_path"] in long_notes:
+                    file_map[long_notes[meta["file_path"]][0]].add(hierarchy)
+            for name, headings in long_notes.values():
+                if not file_map[name]:
+                    file_map[name].update(headings[:_MAX_SUMMARY_HEADINGS])
 
         return {name: sorted(headings) for name, headings in sorted(file_map.items())}
 
     def list_sources(self) -> list[str]:
         """Return sorted unique file names from all indexed chunks."""
-        results = self.collection.get(include=["metadatas"])
-        names = {m["file_name"] for m in results["metadatas"] if "file_name" in m}
-        return sorted(names)
+        return self.catalog.names()
+
+    def iter_files(self):
+        """Yield per-file catalog rows (path, name, hash, chunk_count, mtime, indexed_at)."""
+        return self.catalog.iter_files()
 
     def count(self) -> int:
         """Return number of chunks in the store."""
@@ -0,0 +1,168 @@
+import os
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+from rich.console import Console
+
+from .config import Config
+from .daemon import connect
+from .ingest import run_ingest
+from .manifest import Manifest
+from .scanner import VaultScanner
+
+console = Console()
+
+
+def _poll_changes(scanner: VaultScanner, interval: float) -> Iterator[set[Path]]:
+    """Yield the notes whose size or mtime changed (or that appeared or vanished) between scans.
+
+    Fallback for when watchfiles is not installed: each poll walks the
+    vault and stats every note, but reads nothing.
+    """
+    def snapshot() -> dict[Path, tuple[int, int]]:
+        state = {}
+        for path in scanner.scan().files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    previous = snapshot()
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        changed = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+        previous = current
+        if changed:
+            yield changed
+
+
+def _affected_notes(paths: set[Path], scanner: VaultScanner, indexed: dict[str, str]) -> set[Path]:
+    """Notes to bring up to date for a set of changed paths.
+
+    Folders moved into the vault contribute every note under them, and
+    folders that disappeared every indexed note they held.
+    """
+    notes = set()
+    for path in paths:
+        if path.is_dir():
+            notes.update(scanner.scan(start=path).files)
+        elif scanner.accepts(path):
+            notes.add(path)
+        elif not path.exists():
+            prefix = str(path) + os.sep
+            notes.update(Path(fp) for fp in indexed if fp.startswith(prefix))
+    return notes
+
+
+def _ingest_notes(
+    config: Config,
+    notes_path: Path,
+    services: tuple,
+    notes: set[Path],
+    manifest: Manifest,
+    stored_hashes: dict[str, str],
+) -> tuple[dict, dict[Path, Exception]]:
+    """Bring `notes` up to date; returns the counts and the notes that failed, with their errors.
+
+    If the batch as a whole fails, each note is retried on its own so one
+    unreadable note does not hold back the others.
+    """
+    def ingest(paths: set[Path]) -> dict:
+        return run_ingest(
+            config, notes_path, workers=1, services=services, paths=paths, quiet=True,
+            manifest=manifest, stored_hashes=stored_hashes,
+        )
+
+    stats = {"files": 0, "chunks": 0, "added": 0, "removed": 0, "deleted": 0}
+    failed = {}
+    try:
+        return ingest(notes), failed
+    except Exception as e:
+        if len(notes) == 1:
+            failed[next(iter(notes))] = e
+        else:
+            for path in sorted(notes):
+                try:
+                    for key, value in ingest({path}).items():
+                        stats[key] += value
+                except Exception as note_error:
+                    failed[path] = note_error
+    # A failed write can leave a note half updated: treat it as changed next time.
+    for path in failed:
+        stored_hashes[str(path)] = ""
+    return stats, failed
+
+
+def run_watch(config: Config, notes_path: Path, poll: bool = False):
+    """Keep the index in sync with the notes folder until interrupted.
+
+    The model and store are loaded once (or borrowed from `nsie serve`),
+    the vault is brought up to date with a normal incremental ingest, and
+    from then on only the files named by filesystem events are re-hashed
+    and re-indexed. The ingest manifest and the stored hashes stay in
+    memory while watching; the manifest is saved when the watcher stops.
+    A note that fails to index is reported and retried on its next change.
+    """
+    client = connect(config)
+    if client is not None:
+        services = (client.embedder, client.store)
+    else:
+        with console.status("Loading embedding model..."):
+            from .embeddings import EmbeddingService
+            embedder = EmbeddingService.from_config(config)
+
+        from .vectorstore import VectorStore
+
+        services = (embedder, VectorStore(config.paths.database_directory))
+
+    run_ingest(config, notes_path, workers=1, services=services)
+
+    scanner = VaultScanner.from_config(config, notes_path)
+    manifest = Manifest(config.paths.database_directory / "ingest_manifest.json")
+    stored_hashes = services[1].get_file_hashes()
+    try:
+        import watchfiles
+    except ImportError:
+        changes = _poll_changes(scanner, config.ingest.watch_poll_seconds)
+        mode = f"polling every {config.ingest.watch_poll_seconds:g} s; install notesieves\\[watch] for events"
+    else:
+        # Events are grouped until none arrive for `step` ms, so a burst of
+        # saves becomes one update.
+        changes = (
+            {Path(path) for _, path in batch}
+            for batch in watchfiles.watch(notes_path, step=config.ingest.watch_debounce_ms, force_polling=poll)
+        )
+        mode = "polling" if poll else "filesystem events"
+    console.print(f"\nWatching [bold]{notes_path}[/bold] for changes ({mode}). Press Ctrl+C to stop.")
+
+    try:
+        for changed in changes:
+            notes = _affected_notes(changed, scanner, stored_hashes)
+            if not notes:
+                continue
+            started_at = time.perf_counter()
+            stats, failed = _ingest_notes(config, notes_path, services, notes, manifest, stored_hashes)
+            for path, error in sorted(failed.items()):
+                console.print(f"[red]Could not index[/red] {path}: {type(error).__name__}: {error}", highlight=False)
+            done = []
+            if stats["files"]:
+                done.append(
+                    f"{stats['files']} files indexed ({stats['added']} chunks added, {stats['removed']} removed)"
+                )
+            if stats["deleted"]:
+                done.append(f"{stats['deleted']} files removed")
+            if done:
+                console.print(
+                    f"[dim]{datetime.now():%H:%M:%S}[/dim]  {', '.join(done)}  "
+                    f"[dim]{(time.perf_counter() - started_at) * 1000:.0f} ms[/dim]",
+                    highlight=False,
+                )
+    except KeyboardInterrupt:
+        console.print("Stopped watching.")
+    finally:
+        manifest.save()